@@ -0,0 +1,86 @@
+import bisect
+
+# Ranks of a match; lower is better
+EXACT = 0
+PREFIX = 1
+WORD_PREFIX = 2
+SUBSTRING = 3
+
+def normalize(text):
+    return " ".join(str(text).split()).casefold()
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class AutocompleteIndex:
+    """
+    Search index over a list of names, built once per list.
+    Every name (and its extra keys, e.g. course codes) is lowercased once and indexed by
+    the start of each word in a sorted array for prefix lookups, and by trigrams for
+    substring lookups. Results are ranked: exact match, prefix, word prefix, substring.
+    """
+
+    def __init__(self, items, extra_keys=None):
+        """
+        :param items: Names to search and return, e.g. course names.
+        :param extra_keys: Optional list parallel to items with more strings to match each item by.
+        """
+        self.items = list(items)
+        self._keys = []
+        self._trigrams = {}
+        prefixes = []
+        for item_id, item in enumerate(self.items):
+            keys = {normalize(item)}
+            if extra_keys is not None:
+                keys.update(normalize(key) for key in extra_keys[item_id] if key)
+            keys.discard("")
+            for key in keys:
+                offset = 0
+                for position, word in enumerate(key.split(" ")):
+                    prefixes.append((key[offset:], item_id, PREFIX if position == 0 else WORD_PREFIX))
+                    offset += len(word) + 1
+                for gram in trigrams(key):
+                    self._trigrams.setdefault(gram, set()).add(item_id)
+            self._keys.append(keys)
+
+        prefixes.sort()
+        self._prefix_keys = [key for key, _, _ in prefixes]
+        self._prefix_entries = [(item_id, rank) for _, item_id, rank in prefixes]
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, query, limit=None):
+        """
+        :param query: Text typed so far; case and repeated whitespace are ignored.
+        :param limit: Maximum number of items to return, or None for every match.
+        :return: Matching items, best first. An empty query returns every item in order.
+        """
+        query = normalize(query)
+        if not query:
+            return self.items[:limit]
+
+        ranks = {}
+        start = bisect.bisect_left(self._prefix_keys, query)
+        for i in range(start, len(self._prefix_keys)):
+            key = self._prefix_keys[i]
+            if not key.startswith(query):
+                break
+            item_id, rank = self._prefix_entries[i]
+            if rank == PREFIX and key == query:
+                rank = EXACT
+            ranks[item_id] = min(rank, ranks.get(item_id, rank))
+
+        grams = trigrams(query)
+        if grams:
+            postings = sorted((self._trigrams.get(gram, set()) for gram in grams), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            # Queries shorter than a trigram are checked against every item
+            candidates = range(len(self.items))
+        for item_id in candidates:
+            if item_id not in ranks and any(query in key for key in self._keys[item_id]):
+                ranks[item_id] = SUBSTRING
+
+        ranked = sorted(ranks, key=lambda item_id: (ranks[item_id], len(self.items[item_id]), self.items[item_id]))
+        return [self.items[item_id] for item_id in ranked[:limit]]
@@ -1,70 +1,239 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter.filedialog import asksaveasfilename
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import csv
+import hashlib
+import json
+import os
+import queue
+import threading
+import traceback
+from autocomplete import AutocompleteIndex
 SERVER_IP = "PLACEHOLDER"
 
 SERVER_URL = f"http://{SERVER_IP}:5000"
 
+# Catalog responses are kept on disk and revalidated with their ETag on every launch
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pcp_cache")
+
+# Keep-alive connection to the server for catalog requests
+http = requests.Session()
+
+# Conversation session assigned by the server on the first plan request
+session_id = None
+
+# Server calls run on background threads; Tk is only touched from the main thread, which
+# picks up their results from ui_calls every UI_POLL_MS milliseconds
+UI_POLL_MS = 50
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="client")
+ui_calls = queue.Queue()
+closing = threading.Event()
+
+# Course lists by department with their search index, fetched once and shared by every row
+courses_by_department = {}
+
+# Keys that move through or close a dropdown rather than edit the text
+NAVIGATION_KEYS = {"Up", "Down", "Left", "Right", "Return", "Escape", "Tab", "Home", "End"}
+
+def on_ui_thread(callback, *args):
+    """
+    Schedules callback(*args) on the Tk thread. Safe to call from any thread.
+    """
+    ui_calls.put((callback, args))
+
+def process_ui_calls():
+    """
+    Runs the callbacks scheduled by background threads and re-arms itself with root.after.
+    """
+    try:
+        while True:
+            try:
+                callback, args = ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()
+    finally:
+        root.after(UI_POLL_MS, process_ui_calls)
+
+def when_done(future, on_success, on_error):
+    """
+    Calls on_success(result) or on_error(exception) on the Tk thread once the future completes.
+    """
+    def done(future):
+        error = future.exception()
+        if error is None:
+            on_ui_thread(on_success, future.result())
+        else:
+            on_ui_thread(on_error, error)
+
+    future.add_done_callback(done)
+
+def run_in_background(work, on_success, on_error):
+    """
+    Runs work() on the executor and hands its result back to the Tk thread.
+    """
+    future = executor.submit(work)
+    when_done(future, on_success, on_error)
+    return future
+
+def cached_get(path, params=None):
+    """
+    GETs a catalog resource, revalidating the copy cached on disk with its ETag.
+    A 304 answer reuses the cached body; if the server cannot be reached the cached body is used as is.
+    :return: Decoded JSON body.
+    """
+    key = hashlib.sha1(f"{SERVER_URL}{path}?{json.dumps(params, sort_keys=True)}".encode("utf-8")).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"{key}.json")
+    try:
+        with open(cache_path, encoding="utf-8") as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        cached = None
+
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    try:
+        response = http.get(f"{SERVER_URL}{path}", params=params, headers=headers)
+    except requests.ConnectionError:
+        if cached is None:
+            raise
+        return cached["body"]
+    if response.status_code == 304 and cached is not None:
+        return cached["body"]
+    response.raise_for_status()
+
+    body = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"etag": etag, "body": body}, file)
+        os.replace(temp_path, cache_path)
+    return body
+
 def fetch_departments():
     """
     Fetches the list of departments and their subject code prefixes from the server.
+    Runs on a background thread.
     """
-    try:
-        response = requests.get(f"{SERVER_URL}/get_departments")
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to fetch departments: {str(e)}")
-        return []
+    return cached_get("/get_departments")
 
 def fetch_courses(department):
     """
     Fetches the list of courses for a specific department from the server.
+    Runs on a background thread.
     """
-    try:
-        payload = {"Department": department}
-        response = requests.post(f"{SERVER_URL}/get_courses", json=payload)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to fetch courses: {str(e)}")
-        return []
+    return cached_get("/get_courses", {"department": department})
+
+def load_departments():
+    """
+    Fetches the departments and indexes them by name and subject code prefix. Runs on a background thread.
+    :return: Tuple of (departments, AutocompleteIndex over the department names).
+    """
+    departments = fetch_departments()
+    index = AutocompleteIndex(
+        [d["Department"] for d in departments],
+        extra_keys=[[d.get("Prefix")] for d in departments],
+    )
+    return departments, index
+
+def load_courses(department):
+    """
+    Fetches a department's courses and indexes them by name and code. Runs on a background thread.
+    :return: Tuple of (courses, AutocompleteIndex over the course names).
+    """
+    courses = fetch_courses(department)
+    index = AutocompleteIndex(
+        [course["Course Name"] for course in courses],
+        # "ELE 500" is also found as "ele500"
+        extra_keys=[[course["Course Code"] or "", (course["Course Code"] or "").replace(" ", "")] for course in courses],
+    )
+    return courses, index
+
+def bind_autocomplete(combobox, get_index):
+    """
+    Filters a combobox's options through an AutocompleteIndex on every keystroke and when clicked.
+    :param get_index: Returns the current index, or None while it is loading.
+    """
+    def filter_options(event):
+        if getattr(event, "keysym", None) in NAVIGATION_KEYS:
+            return
+        index = get_index()
+        if index is not None:
+            combobox["values"] = index.search(combobox.get())
+
+    combobox.bind("<Button-1>", filter_options)
+    combobox.bind("<KeyRelease>", filter_options)
 
 def populate_departments():
     """
-    Populates the department dropdown dynamically with filtering only when clicked.
+    Loads the departments in the background and filters the dropdown as the user types.
     """
-    global departments_data
+    def on_loaded(result):
+        global departments_data, department_index
+        departments_data, department_index = result
 
-    departments_data = fetch_departments()
-    all_departments = [d["Department"] for d in departments_data]
+    def on_error(e):
+        messagebox.showerror("Error", f"Failed to fetch departments: {str(e)}")
 
-    def filter_departments(event):
-        user_input = department_selector.get()
-        filtered_departments = [d for d in all_departments if user_input.lower() in d.lower()]
-        department_selector["values"] = filtered_departments
+    bind_autocomplete(department_selector, lambda: department_index)
+    run_in_background(load_departments, on_loaded, on_error)
 
-    # Bind the dropdown to filter when clicked
-    department_selector.bind("<Button-1>", filter_departments)
+def courses_future(department):
+    """
+    Returns the pending or completed fetch of a department's courses, starting it if needed.
+    """
+    future = courses_by_department.get(department)
+    if future is None:
+        future = executor.submit(load_courses, department)
+        courses_by_department[department] = future
+    return future
 
-def add_course_row():
+def prefetch_courses(event):
     """
-    Adds a new row to the completed courses table with a course name dropdown 
-    that filters options only when the dropdown button is clicked.
+    Starts loading the selected department's courses before the first row is added.
     """
-    global course_rows
+    department = department_selector.get()
+    if department:
+        courses_future(department)
 
+def add_course_row():
+    """
+    Adds a new row to the completed courses table once the department's courses are loaded.
+    """
     selected_department = department_selector.get()
     if not selected_department:
         messagebox.showerror("Error", "Please select a department before adding courses!")
         return
 
-    courses_data = fetch_courses(selected_department)
-    if not courses_data:
-        messagebox.showerror("Error", "Failed to fetch courses for the selected department!")
-        return
+    future = courses_future(selected_department)
+
+    def on_loaded(result):
+        courses_data, course_index = result
+        if not courses_data:
+            messagebox.showerror("Error", "Failed to fetch courses for the selected department!")
+            return
+        create_course_row(courses_data, course_index)
+
+    def on_error(e):
+        # Forget the failed fetch so the next click retries it
+        if courses_by_department.get(selected_department) is future:
+            del courses_by_department[selected_department]
+        messagebox.showerror("Error", f"Failed to fetch courses: {str(e)}")
+
+    when_done(future, on_loaded, on_error)
+
+def create_course_row(courses_data, course_index):
+    """
+    Adds a new row to the completed courses table with a course name dropdown
+    that is filtered by name or code as the user types.
+    """
+    global course_rows
 
     row_number = len(course_rows) + 1
 
@@ -78,15 +247,6 @@ def add_course_row():
         "Remove": tk.Button(course_table, text="Remove", width=10)
     }
 
-    # Populate the initial dropdown with all course names
-    all_course_names = [course["Course Name"] for course in courses_data]
-
-    # Function to filter the dropdown when clicked
-    def populate_dropdown(event, row=row_data):
-        user_input = row["Course Name"].get()
-        filtered_courses = [course for course in all_course_names if user_input.lower() in course.lower()]
-        row["Course Name"]["values"] = filtered_courses
-
     # Function to autofill course code when a course is selected
     def on_course_selected(event, row=row_data):
         selected_course_name = row["Course Name"].get()
@@ -104,7 +264,7 @@ def add_course_row():
         update_row_numbers()
 
     # Bind events
-    row_data["Course Name"].bind("<Button-1>", populate_dropdown)  # Populate dropdown only when clicked
+    bind_autocomplete(row_data["Course Name"], lambda: course_index)  # Filter dropdown as the user types
     row_data["Course Name"].bind("<<ComboboxSelected>>", on_course_selected)  # Autofill code on selection
     row_data["Remove"].config(command=remove_row)
 
@@ -125,9 +285,11 @@ def update_row_numbers():
     for i, row in enumerate(course_rows):
         row["S.No"].config(text=i + 1)
 
-def display_academic_plan(plan):
+def start_plan_display():
     """
-    Displays the academic plan as a single table and adds an Export button.
+    Clears the results area and creates an empty academic plan table.
+    :return: Tuple of (add_semester, finish) functions; add_semester(semester, details) appends
+    a semester's courses to the table and finish() adds the Export button for the whole plan.
     """
     for widget in results_frame.winfo_children():
         widget.destroy()
@@ -153,23 +315,36 @@ def display_academic_plan(plan):
     plan_table.column("Semester", width=100, anchor="center")
     plan_table.pack(pady=10, fill=tk.X, expand=True)
 
-    s_no = 1
-    for semester, details in plan.items():
+    plan = {}
+
+    def add_semester(semester, details):
+        # A semester sent again (e.g. repaired by the server) replaces its earlier rows
+        plan[semester] = details
+        existing = plan_table.tag_has(semester)
+        position = plan_table.index(existing[0]) if existing else "end"
+        plan_table.delete(*existing)
         for course in details["Courses"]:
             plan_table.insert(
-                "", "end",
+                "", position,
                 values=(
-                    s_no,
+                    0,
                     course["Course Name"],
                     course["Course Code"],
                     course["Credits"],
                     semester
-                )
+                ),
+                tags=(semester,)
             )
-            s_no += 1
+            if position != "end":
+                position += 1
+        for s_no, item in enumerate(plan_table.get_children(), start=1):
+            plan_table.set(item, "S.No.", s_no)
+
+    def finish():
+        export_button = tk.Button(results_frame, text="Export to CSV", command=lambda: export_to_csv(plan), bg="lightblue")
+        export_button.pack(pady=10)
 
-    export_button = tk.Button(results_frame, text="Export to CSV", command=lambda: export_to_csv(plan), bg="lightblue")
-    export_button.pack(pady=10)
+    return add_semester, finish
 
 def export_to_csv(plan):
     """
@@ -245,22 +420,48 @@ def submit_selection():
         "Completed Courses": completed_courses,
     }
 
-    try:
-        response = requests.post(f"{SERVER_URL}/generate_subjects", json=payload)
-        response.raise_for_status()
-        data = response.json()
-        display_academic_plan(data)
-    except Exception as e:
+    headers = {"X-Session-ID": session_id} if session_id else {}
+    add_semester, finish = start_plan_display()
+    submit_button.config(state=tk.DISABLED)
+
+    def stream_plan():
+        # Runs on a background thread; each semester is rendered as soon as the server streams it
+        global session_id
+        with requests.post(f"{SERVER_URL}/generate_subjects_stream", json=payload, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            session_id = response.headers.get("X-Session-ID", session_id)
+            for line in response.iter_lines():
+                if closing.is_set():
+                    return
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    raise RuntimeError(event["error"])
+                if "Semester" in event:
+                    on_ui_thread(add_semester, event["Semester"], event["Details"])
+
+    def on_done(_):
+        submit_button.config(state=tk.NORMAL)
+        finish()
+
+    def on_error(e):
+        submit_button.config(state=tk.NORMAL)
         messagebox.showerror("Error", f"Failed to submit data: {str(e)}")
 
+    run_in_background(stream_plan, on_done, on_error)
+
 # Initialize Tkinter
 root = tk.Tk()
 root.title("Personalized Course Planner with Large Language Model")
 root.geometry("900x600")
 
 departments_data = []
+department_index = None
 
 department_selector = ttk.Combobox(root, state="normal", width=40)
+department_selector.bind("<<ComboboxSelected>>", prefetch_courses)
+# Starts the department request without waiting for it; the window opens right away
 populate_departments()
 tk.Label(root, text="Select a Department:", font=("Arial", 12)).pack(pady=5)
 department_selector.pack(pady=5)
@@ -297,4 +498,9 @@ submit_button.pack(pady=20)
 results_frame = tk.Frame(root)
 results_frame.pack(pady=20)
 
+root.after(UI_POLL_MS, process_ui_calls)
 root.mainloop()
+
+# Let a plan still streaming stop at its next line instead of keeping the process alive
+closing.set()
+executor.shutdown(wait=False, cancel_futures=True)
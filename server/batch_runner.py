@@ -0,0 +1,150 @@
+"""
+Offline batch planner: reads student payloads from a JSONL file, generates a plan for each
+through the server at batch priority and appends the results to an output JSONL file.
+
+    python batch_runner.py students.jsonl plans.jsonl --concurrency 2
+
+Each input line is a payload in the same shape the client sends to /generate_subjects,
+optionally with an "id". Records already planned in the output file are skipped, so an
+interrupted run continues where it stopped when started again with the same arguments.
+At most as many plans are requested at once as the server has model slots, so a batch
+never fills the server's work queue by itself.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import json
+import threading
+import time
+import requests
+
+DEFAULT_SERVER_URL = "http://localhost:5000"
+MAX_RETRIES = 10
+# Used when the server does not report its model concurrency
+DEFAULT_MAX_CONCURRENCY = 2
+REPORT_EVERY = 10
+
+def read_payloads(path):
+    """
+    :return: List of (record key, payload). The key is the payload's "id", or its line number.
+    """
+    payloads = []
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                payload = json.loads(line)
+                payloads.append((str(payload.get("id", line_number)), payload))
+    return payloads
+
+def read_completed(path):
+    """
+    :return: Keys of records that already have a plan in the output file.
+    """
+    completed = set()
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interruption; that record is planned again
+                    continue
+                if "plan" in record:
+                    completed.add(record["key"])
+    except FileNotFoundError:
+        pass
+    return completed
+
+def server_concurrency(session, server_url):
+    """
+    :return: Number of plans the server generates at once, from /queue_stats, or None if unavailable.
+    """
+    try:
+        response = session.get(f"{server_url}/queue_stats", timeout=10)
+        response.raise_for_status()
+        return int(response.json()["concurrency"])
+    except (requests.RequestException, ValueError, KeyError, TypeError):
+        return None
+
+def plan_one(session, server_url, payload):
+    """
+    Requests one plan, waiting out 503 responses for as long as the server asks.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        response = session.post(
+            f"{server_url}/generate_subjects",
+            json=payload,
+            headers={"X-Priority": "batch"},
+        )
+        if response.status_code == 503 and attempt < MAX_RETRIES:
+            time.sleep(min(int(response.headers.get("Retry-After", "5")), 60))
+            continue
+        response.raise_for_status()
+        return response.json()
+
+def run_batch(input_path, output_path, server_url=DEFAULT_SERVER_URL, concurrency=2):
+    """
+    Plans every pending payload of the input file and appends the results to the output file.
+    :param concurrency: Plans requested in parallel, capped at the server's model concurrency.
+    :return: Dictionary with counts and throughput in plans per minute.
+    """
+    payloads = read_payloads(input_path)
+    completed = read_completed(output_path)
+    pending = [(key, payload) for key, payload in payloads if key not in completed]
+    print(f"{len(payloads)} payloads, {len(payloads) - len(pending)} already planned, {len(pending)} to go")
+
+    session = requests.Session()
+    max_concurrency = server_concurrency(session, server_url) or DEFAULT_MAX_CONCURRENCY
+    if concurrency > max_concurrency:
+        print(f"Limiting concurrency to {max_concurrency}, the number of plans the server generates at once")
+        concurrency = max_concurrency
+    concurrency = max(1, concurrency)
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    write_lock = threading.Lock()
+    planned = failed = 0
+    started = time.monotonic()
+
+    def run(key, payload):
+        job_started = time.monotonic()
+        record = {"key": key}
+        try:
+            record["plan"] = plan_one(session, server_url, payload)
+        except Exception as e:
+            record["error"] = str(e)
+        record["elapsed"] = round(time.monotonic() - job_started, 3)
+        return record
+
+    with open(output_path, "a", encoding="utf-8") as output, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run, key, payload) for key, payload in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+            if "plan" in record:
+                planned += 1
+            else:
+                failed += 1
+            if (planned + failed) % REPORT_EVERY == 0:
+                minutes = (time.monotonic() - started) / 60
+                print(f"{planned + failed}/{len(pending)} done, {planned / minutes:.1f} plans/min")
+
+    minutes = (time.monotonic() - started) / 60
+    return {
+        "planned": planned,
+        "failed": failed,
+        "skipped": len(payloads) - len(pending),
+        "plans_per_minute": planned / minutes if minutes else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate academic plans for a JSONL file of student payloads.")
+    parser.add_argument("input", help="JSONL file with one /generate_subjects payload per line")
+    parser.add_argument("output", help="JSONL file the results are appended to")
+    parser.add_argument("--server", default=DEFAULT_SERVER_URL, help="Planner server URL")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Plans requested in parallel, up to the server's model concurrency")
+    args = parser.parse_args()
+
+    summary = run_batch(args.input, args.output, args.server, args.concurrency)
+    print(f"Planned {summary['planned']}, failed {summary['failed']}, skipped {summary['skipped']}: "
+          f"{summary['plans_per_minute']:.1f} plans/min")
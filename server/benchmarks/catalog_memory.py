@@ -0,0 +1,112 @@
+"""
+Memory and load-time comparison of the catalog representations. Run from the server directory:
+
+    python -m benchmarks.catalog_memory --courses-per-department 2500
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.mock_kuali import load_recording, synthetic_catalog
+from modules.compact_catalog import CompactCatalog
+
+def store_rows(recording):
+    """
+    Rows in the shape of CatalogStore.all_courses(), with freshly decoded values per row as the store returns them.
+    """
+    rows = []
+    for course in recording["courses"]:
+        details = recording["details"].get(course["pid"], {})
+        subject = course.get("subjectCode", {})
+        rows.append((
+            course["pid"],
+            subject.get("description"),
+            subject.get("name"),
+            {
+                "Course Name": course.get("title"),
+                "Course Code": course.get("__catalogCourseId"),
+                "Credits": json.loads(json.dumps(details.get("credits"))),
+                "Semester": json.loads(json.dumps(details.get("semester", "Unknown"))),
+            },
+        ))
+    return rows
+
+def dict_catalog(rows):
+    """
+    The previous in-memory representation: a list of course dictionaries per department.
+    """
+    courses_by_department = {}
+    for pid, department, prefix, course in rows:
+        courses_by_department.setdefault(department, []).append(course)
+    return courses_by_department
+
+def retained_bytes(build):
+    """
+    :return: Tuple of (bytes still allocated by the value build() returns, the value).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size, value
+
+def best_time(fn, runs=5):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory use of the catalog representations.")
+    parser.add_argument("--courses-per-department", type=int, default=2500, help="Synthetic catalog size")
+    parser.add_argument("--recording", help="Catalog recording to use instead of a synthetic catalog")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording) if args.recording else synthetic_catalog(args.courses_per_department)
+    recording_text = json.dumps(recording)
+    print(f"{len(recording['courses'])} courses")
+
+    raw_bytes, _ = retained_bytes(lambda: json.loads(recording_text))
+    dict_bytes, courses_by_department = retained_bytes(lambda: dict_catalog(store_rows(recording)))
+    compact_bytes, catalog = retained_bytes(lambda: CompactCatalog.from_rows(store_rows(recording), version=1))
+
+    rows = store_rows(recording)
+    rows_text = json.dumps([list(row) for row in rows])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.snapshot")
+        catalog.save(path)
+        snapshot_size = os.path.getsize(path)
+        load_seconds = best_time(lambda: CompactCatalog.load(path))
+        # The mapping itself is shared page cache; only what each process allocates on top is private
+        mapped_bytes, mapped = retained_bytes(lambda: CompactCatalog.load(path))
+        assert mapped.courses_by_department("Electrical Engineering") == catalog.courses_by_department("Electrical Engineering")
+
+    print(f"{'representation':36} {'private memory':>14} {'vs dicts':>9}")
+    for name, size in (
+        ("raw Kuali JSON", raw_bytes),
+        ("course dicts per department", dict_bytes),
+        ("compact columnar catalog", compact_bytes),
+        ("compact catalog, mapped snapshot", mapped_bytes),
+    ):
+        print(f"{name:36} {size / 1024 / 1024:>10.2f} MiB {size / dict_bytes:>8.2f}x")
+    build_seconds = best_time(lambda: CompactCatalog.from_rows(rows, version=1))
+    json_seconds = best_time(lambda: json.loads(rows_text))
+
+    print(f"snapshot: {snapshot_size / 1024:.0f} KiB (JSON rows: {len(rows_text) / 1024:.0f} KiB)")
+    print(f"map snapshot {load_seconds * 1000:.1f} ms, build from rows {build_seconds * 1000:.1f} ms, "
+          f"json.loads rows {json_seconds * 1000:.1f} ms")
+
+    assert catalog.courses_by_department("Electrical Engineering") == courses_by_department.get("Electrical Engineering", [])
+
+if __name__ == "__main__":
+    main()
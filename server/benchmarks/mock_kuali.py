@@ -0,0 +1,136 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+
+SYNTHETIC_DEPARTMENTS = [
+    ("Electrical Engineering", "ELE"),
+    ("Computer Science", "CSC"),
+    ("Mathematics", "MTH"),
+    ("Mechanical Engineering", "MCE"),
+]
+SYNTHETIC_TOPICS = [
+    "Machine Learning", "Signal Processing", "Neural Networks", "Random Processes", "Computer Architecture",
+    "Optimization", "Embedded Systems", "Wireless Communications", "Control Systems", "VLSI Design",
+    "Information Theory", "Robotics", "Power Electronics", "Antenna Theory", "Computer Vision",
+    "Pattern Recognition", "Biomedical Signals", "Quantum Devices", "Network Security", "Estimation Theory",
+]
+
+def synthetic_catalog(courses_per_department=60, seed=0):
+    """
+    Builds a catalog recording in the shape of the Kuali API for when no real recording is available.
+    :return: Dictionary with "courses" (list endpoint) and "details" (PID -> detail endpoint).
+    """
+    rng = random.Random(seed)
+    courses = []
+    details = {}
+    for department, prefix in SYNTHETIC_DEPARTMENTS:
+        for i in range(courses_per_department):
+            number = 400 + i * 5 if prefix != "ELE" else 500 + i * 3
+            topic = SYNTHETIC_TOPICS[i % len(SYNTHETIC_TOPICS)]
+            pid = f"{prefix.lower()}{number}"
+            courses.append({
+                "pid": pid,
+                "title": f"{'Advanced ' if number >= 600 else ''}{topic}",
+                "__catalogCourseId": f"{prefix}{number}",
+                "subjectCode": {"name": prefix, "description": department},
+            })
+            details[pid] = {
+                "pid": pid,
+                "credits": {"credits": {"min": 3, "max": 3}},
+                "semester": rng.choice(["Fall", "Spring", "Fall and Spring"]),
+                "description": f"Graduate study of {topic.lower()} with applications in {department.lower()}.",
+            }
+    for pid, code, title, credits in (
+        ("ele601", "ELE601", "Graduate Seminar in Electrical Engineering", 1),
+        ("ele699", "ELE699", "Doctoral Dissertation Research", {"credits": {"min": 1, "max": 12}}),
+        ("ele599", "ELE599", "Masters Thesis Research", {"credits": {"min": 1, "max": 6}}),
+    ):
+        courses.append({
+            "pid": pid,
+            "title": title,
+            "__catalogCourseId": code,
+            "subjectCode": {"name": "ELE", "description": "Electrical Engineering"},
+        })
+        details[pid] = {"pid": pid, "credits": credits, "semester": "Fall and Spring", "description": title}
+    return {"courses": courses, "details": details}
+
+def record_catalog(path, limit=None):
+    """
+    Records the live Kuali catalog (and up to `limit` course details) to a JSON file for replay.
+    """
+    from modules.course_scraper import fetch_all_courses, fetch_course_details
+
+    courses = fetch_all_courses()
+    details = {}
+    for course in courses[:limit]:
+        pid = course.get("pid")
+        if pid:
+            details[pid] = fetch_course_details(pid)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"courses": courses, "details": details}, file)
+
+def load_recording(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+class MockKualiServer:
+    """
+    Replays a catalog recording over HTTP with the same paths as the Kuali API:
+    /api/v1/catalog/courses/<catalog id> and /api/v1/catalog/course/<catalog id>/<pid>.
+    Every response is delayed by `latency` seconds plus up to `jitter` seconds.
+    """
+
+    def __init__(self, recording, latency=0.05, jitter=0.02, host="127.0.0.1", port=0):
+        self.recording = recording
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.latency + random.random() * server.jitter)
+                parts = self.path.rstrip("/").split("/")
+                if "courses" in parts:
+                    self._send(200, server.recording["courses"])
+                elif "course" in parts and parts[-1] in server.recording["details"]:
+                    self._send(200, server.recording["details"][parts[-1]])
+                else:
+                    self._send(404, {"error": "Not found"})
+
+            def _send(self, status, body):
+                encoded = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def catalog_url(self):
+        return f"{self.url}/api/v1/catalog/courses/mock"
+
+    @property
+    def course_details_url(self):
+        return f"{self.url}/api/v1/catalog/course/mock"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="mock-kuali", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
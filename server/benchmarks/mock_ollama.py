@@ -0,0 +1,116 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+CHARS_PER_TOKEN = 4
+
+def sample_plan(semesters=5):
+    """
+    A plan in the format the prompt asks for, used as the mock model's answer.
+    """
+    plan = {}
+    for i in range(semesters):
+        courses = []
+        if i % 2 == 0:
+            courses.append({"Course Name": "Graduate Seminar in Electrical Engineering", "Course Code": "ELE 601", "Credits": 1})
+        courses.append({"Course Name": f"Machine Learning {i + 1}", "Course Code": f"ELE {520 + i * 3}", "Credits": 3})
+        courses.append({"Course Name": f"Signal Processing {i + 1}", "Course Code": f"ELE {560 + i * 3}", "Credits": 3})
+        courses.append({"Course Name": "Doctoral Dissertation Research", "Course Code": "ELE 699", "Credits": 4})
+        plan[f"Semester {i + 1}"] = {"Total Credits": sum(c["Credits"] for c in courses), "Courses": courses}
+    return plan
+
+class MockOllamaServer:
+    """
+    Stand-in for Ollama's /api/chat. Waits for prefill in proportion to the prompt size,
+    then streams the answer as NDJSON chunks of one token (about four characters) at
+    `token_rate` tokens per second, ending with a "done" chunk carrying timing statistics.
+    When the request carries a "format", any prose before the JSON answer is left out.
+    """
+
+    def __init__(self, token_rate=100, prefill_rate=2000, answer=None, host="127.0.0.1", port=0):
+        """
+        :param token_rate: Generated tokens per second.
+        :param prefill_rate: Prompt tokens processed per second before the first token.
+        :param answer: Text the model answers with; defaults to a short preamble and sample_plan().
+        """
+        self.token_rate = token_rate
+        self.prefill_rate = prefill_rate
+        self.answer = answer if answer is not None else "Here is the plan:\n" + json.dumps(sample_plan(), indent=2)
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                server.requests += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompt_chars = sum(len(message.get("content", "")) for message in body.get("messages", []))
+                prompt_tokens = max(1, prompt_chars // CHARS_PER_TOKEN)
+                options = body.get("options") or {}
+
+                started = time.monotonic()
+                time.sleep(prompt_tokens / server.prefill_rate)
+                prefill_ns = int((time.monotonic() - started) * 1e9)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                answer = server.answer
+                if body.get("format") is not None and "{" in answer:
+                    # Structured outputs start at the JSON itself
+                    answer = answer[answer.index("{"):]
+                if options.get("num_predict") is not None:
+                    answer = answer[:max(0, options["num_predict"]) * CHARS_PER_TOKEN]
+                generated = 0
+                generation_started = time.monotonic()
+                for i in range(0, len(answer), CHARS_PER_TOKEN):
+                    time.sleep(1 / server.token_rate)
+                    chunk = {"model": body.get("model"), "message": {"role": "assistant", "content": answer[i:i + CHARS_PER_TOKEN]}, "done": False}
+                    if not self._write_chunk(chunk):
+                        return
+                    generated += 1
+
+                self._write_chunk({
+                    "model": body.get("model"),
+                    "message": {"role": "assistant", "content": ""},
+                    "done": True,
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": prefill_ns,
+                    "eval_count": generated,
+                    "eval_duration": int((time.monotonic() - generation_started) * 1e9),
+                })
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, chunk):
+                data = (json.dumps(chunk) + "\n").encode("utf-8")
+                try:
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                    return True
+                except (BrokenPipeError, ConnectionResetError):
+                    # The server aborted the stream
+                    return False
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        # Clients drop idle keep-alive connections; that is not worth a traceback
+        self.httpd.handle_error = lambda request, client_address: None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/chat"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="mock-ollama", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
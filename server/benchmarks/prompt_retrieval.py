@@ -0,0 +1,71 @@
+"""
+Prompt size with and without retrieval of the relevant catalog courses. Run from the server directory:
+
+    python -m benchmarks.prompt_retrieval --sizes 60 250 1000
+"""
+import argparse
+import time
+
+from benchmarks.mock_kuali import synthetic_catalog
+from modules.course_retrieval import CourseRetriever
+from modules.prompts import STATIC_PREFIX, catalog_section, student_details
+from modules.sessions import estimate_tokens
+
+DEPARTMENT = "Electrical Engineering"
+STUDENT = {
+    "Department": DEPARTMENT,
+    "Program of Study": "Machine learning for wireless signal processing",
+    "Masters Completed": False,
+    "Completed Courses": [
+        {"Course Name": "Neural Networks", "Course Code": "ELE 506", "Credits": 3},
+        {"Course Name": "Random Processes", "Course Code": "ELE 509", "Credits": 3},
+    ],
+}
+PINNED_CODES = ("ELE 699", "ELE 599", "ELE 601")
+
+def department_courses(recording):
+    """
+    :return: Tuple of (course dictionaries like get_courses_by_department() returns, their descriptions).
+    """
+    courses = []
+    descriptions = []
+    for course in recording["courses"]:
+        if course["subjectCode"]["description"] != DEPARTMENT:
+            continue
+        details = recording["details"][course["pid"]]
+        courses.append({
+            "Course Name": course["title"],
+            "Course Code": course["__catalogCourseId"],
+            "Credits": details.get("credits"),
+            "Semester": details.get("semester", "Unknown"),
+        })
+        descriptions.append(details.get("description"))
+    return courses, descriptions
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plan prompt sizes with and without course retrieval.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[60, 250, 1000], help="Courses per department")
+    parser.add_argument("--top-k", type=int, default=40)
+    args = parser.parse_args()
+
+    base_tokens = estimate_tokens(STATIC_PREFIX + student_details(STUDENT))
+    print(f"static prefix and student details: {base_tokens} tokens")
+    print(f"{'courses':>8} {'full prompt':>12} {'retrieved':>10} {'saved':>7} {'build':>9} {'query':>8}")
+    for size in args.sizes:
+        courses, descriptions = department_courses(synthetic_catalog(size))
+        started = time.perf_counter()
+        retriever = CourseRetriever(courses, descriptions)
+        build_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        retrieved = retriever.top_k(STUDENT["Program of Study"], STUDENT["Completed Courses"], args.top_k, PINNED_CODES)
+        query_seconds = time.perf_counter() - started
+
+        full_tokens = base_tokens + estimate_tokens(catalog_section(courses))
+        retrieved_tokens = base_tokens + estimate_tokens(catalog_section(retrieved["courses"]))
+        print(f"{len(courses):>8} {full_tokens:>12} {retrieved_tokens:>10} {1 - retrieved_tokens / full_tokens:>6.0%} "
+              f"{build_seconds * 1000:>6.1f} ms {query_seconds * 1000:>5.2f} ms")
+
+    print("top courses:", [course["Course Code"] for course in retrieved["courses"][:10]])
+
+if __name__ == "__main__":
+    main()
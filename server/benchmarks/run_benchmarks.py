@@ -0,0 +1,151 @@
+"""
+Latency and throughput benchmark of the planner endpoints against local stand-ins for
+the Kuali catalog and Ollama. Run from the server directory:
+
+    python -m benchmarks.run_benchmarks --concurrency 1,4,16
+    python -m benchmarks.run_benchmarks --record catalog.json   # record the live catalog once
+    python -m benchmarks.run_benchmarks --recording catalog.json --kuali-latency 0.2
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.mock_kuali import MockKualiServer, load_recording, record_catalog, synthetic_catalog
+from benchmarks.mock_ollama import MockOllamaServer
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def run_load(base_url, method, path, make_payload, total, concurrency):
+    """
+    Sends `total` requests with `concurrency` in flight and measures each one.
+    :return: Dictionary with p50/p95/p99 latency in milliseconds, requests per second and errors.
+    """
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def send(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            response = session.request(method, f"{base_url}{path}", json=make_payload(i))
+            response.content
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "rps": total / wall if wall else 0.0,
+        "errors": errors,
+    }
+
+def plan_payload(program_of_study, use_llm):
+    return {
+        "Department": "Electrical Engineering",
+        "Total Credits": 0,
+        "Program of Study": program_of_study,
+        "Masters Completed": False,
+        "Completed Courses": [
+            {"Course Name": "Machine Learning", "Course Code": "ELE 500", "Credits": "3", "Semester": "Fall"},
+        ],
+        "Use LLM": use_llm,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the planner endpoints against mock upstreams.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per catalog endpoint and level")
+    parser.add_argument("--generate-requests", type=int, default=20, help="Requests per plan endpoint and level")
+    parser.add_argument("--kuali-latency", type=float, default=0.05, help="Mock catalog latency in seconds")
+    parser.add_argument("--token-rate", type=float, default=200, help="Mock model tokens per second")
+    parser.add_argument("--recording", help="Catalog recording to replay instead of a synthetic catalog")
+    parser.add_argument("--record", metavar="PATH", help="Record the live catalog to PATH and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_catalog(args.record)
+        print(f"Recorded catalog to {args.record}")
+        return
+
+    # Keep the benchmark's catalog and sessions away from the real ones; must be set before the server is imported
+    data_dir = tempfile.mkdtemp(prefix="pcp-bench-")
+    os.environ["PCP_CATALOG_DB"] = os.path.join(data_dir, "catalog.db")
+    os.environ["PCP_SESSION_DB"] = os.path.join(data_dir, "sessions.db")
+    from modules import course_scraper, ollama_client
+    from modules.plan_solver import solve_plan
+    import server
+
+    recording = load_recording(args.recording) if args.recording else synthetic_catalog()
+    kuali = MockKualiServer(recording, latency=args.kuali_latency).start()
+    ollama = MockOllamaServer(token_rate=args.token_rate).start()
+    course_scraper.BASE_URL = kuali.catalog_url
+    course_scraper.COURSE_DETAILS_URL = kuali.course_details_url
+    course_scraper.fetch_engine.rate_limits["127.0.0.1"] = 10000
+    ollama_client.OLLAMA_URL = ollama.url
+    server.plan_cache.disk_dir = None
+
+    started = time.perf_counter()
+    result = course_scraper.sync_catalog()
+    print(f"Catalog sync: {result} in {time.perf_counter() - started:.2f}s ({kuali.requests} upstream requests)")
+
+    # Answer with a plan that passes validation, so model plans skip repair and are cached
+    valid_plan = solve_plan(plan_payload("Machine Learning", True), server.get_courses_by_department("Electrical Engineering"))
+    ollama.answer = "Here is the plan:\n" + json.dumps(valid_plan, indent=2)
+
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{httpd.server_port}"
+
+    counter = iter(range(10 ** 9))
+    scenarios = [
+        ("GET /get_departments", "GET", "/get_departments", lambda i: None, args.requests),
+        ("POST /get_courses", "POST", "/get_courses", lambda i: {"Department": "Electrical Engineering"}, args.requests),
+        ("POST /generate_subjects (solver)", "POST", "/generate_subjects",
+         lambda i: plan_payload("Machine Learning", False), args.requests),
+        # A distinct program of study per request misses the plan cache and reaches the model
+        ("POST /generate_subjects (model)", "POST", "/generate_subjects",
+         lambda i: plan_payload(f"Machine Learning {next(counter)}", True), args.generate_requests),
+        ("POST /generate_subjects (cached)", "POST", "/generate_subjects",
+         lambda i: plan_payload("Machine Learning 0", True), args.requests),
+    ]
+
+    print(f"{'endpoint':34} {'conc':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+    for name, method, path, make_payload, total in scenarios:
+        for concurrency in [int(level) for level in args.concurrency.split(",")]:
+            stats = run_load(base_url, method, path, make_payload, total, concurrency)
+            print(f"{name:34} {concurrency:>5} {stats['p50']:>9.1f} {stats['p95']:>9.1f} "
+                  f"{stats['p99']:>9.1f} {stats['rps']:>9.1f} {stats['errors']:>7}")
+
+    httpd.shutdown()
+    kuali.stop()
+    ollama.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for serving wsgi:app with several pre-forked workers.
+The application is imported by each worker rather than preloaded in the master, so no
+sockets, threads or SQLite connections are inherited across fork. Workers share the
+catalog through the SQLite store and the memory-mapped catalog snapshot next to it, and
+sessions through the session database, so any worker can continue any session. The model
+queue, identical-request coalescing and the in-memory plan cache tier are per worker; the
+plan cache's disk tier is shared. Metrics are collected per worker and added up on /metrics
+through the files each worker writes to PCP_METRICS_DIR.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.environ.get("PCP_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("PCP_WORKERS", min(4, multiprocessing.cpu_count())))
+# Threads per worker, so catalog requests are served while others wait on the model
+worker_class = "gthread"
+threads = int(os.environ.get("PCP_THREADS", 8))
+# Plan generation streams for minutes on slow models
+timeout = 300
+graceful_timeout = 30
+preload_app = False
+
+# Read by modules.metrics when the workers import it
+os.environ.setdefault("PCP_METRICS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics"))
+
+def on_starting(server):
+    from modules.metrics import clear_workers
+
+    clear_workers()
+
+def post_worker_init(worker):
+    from modules.course_scraper import CATALOG_SYNC_LOCK_PATH, start_catalog_sync
+    from modules.metrics import start_flush as start_metrics_flush
+    from server import warm_up
+
+    start_catalog_sync(lock_path=CATALOG_SYNC_LOCK_PATH)
+    start_metrics_flush()
+    warm_up()
+
+def worker_exit(server, worker):
+    from modules.metrics import flush
+
+    # Keep the counts of this worker in the totals after it is gone
+    flush()
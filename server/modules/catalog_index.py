@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from modules.compact_catalog import CompactCatalog
+from modules.metrics import CACHE_LOOKUPS
+
+class CatalogIndex:
+    """
+    Process-wide in-memory index over the catalog store.
+    Courses are held in a CompactCatalog that is rebuilt only when the store's catalog
+    version changes, which is checked at most once per TTL. With a snapshot path, the
+    compact catalog is loaded from its binary snapshot when that matches the database and version,
+    and the snapshot is rewritten after every rebuild. Detail records are loaded lazily
+    and kept in an LRU bounded by their approximate size in bytes.
+    """
+
+    def __init__(self, store, ttl_seconds=60, max_detail_bytes=32 * 1024 * 1024, snapshot_path=None):
+        """
+        :param store: CatalogStore to read from.
+        :param ttl_seconds: How long the index is trusted before the catalog version is re-checked.
+        :param max_detail_bytes: Memory cap for cached detail records.
+        :param snapshot_path: File for the binary snapshot of the compact catalog, or None.
+        """
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.max_detail_bytes = max_detail_bytes
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._catalog = CompactCatalog.from_rows([])
+        self._departments = []
+        self._department_by_prefix = {}
+        self._details = OrderedDict()
+        self._detail_bytes = 0
+
+    def invalidate(self):
+        """
+        Forces the next lookup to re-check the catalog version.
+        """
+        with self._lock:
+            self._checked_at = 0.0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.ttl_seconds:
+                return
+            version = self.store.catalog_version()
+            if version != self._version:
+                self._build(version)
+            self._checked_at = now
+
+    def _load_snapshot(self, version, catalog_id):
+        if not self.snapshot_path:
+            return None
+        try:
+            catalog = CompactCatalog.load(self.snapshot_path)
+        except (OSError, ValueError):
+            return None
+        # Versions start over in a new database, so a snapshot left behind by an old one must not match
+        return catalog if catalog.version == version and catalog.catalog_id == catalog_id else None
+
+    def _build(self, version):
+        catalog_id = self.store.catalog_id()
+        catalog = self._load_snapshot(version, catalog_id)
+        if catalog is None:
+            catalog = CompactCatalog.from_rows(self.store.all_courses(), version, catalog_id)
+            if self.snapshot_path:
+                try:
+                    catalog.save(self.snapshot_path)
+                except OSError as e:
+                    print(f"Failed to write catalog snapshot: {e}")
+
+        self._catalog = catalog
+        self._departments = catalog.departments()
+        self._department_by_prefix = {d["Prefix"]: d["Department"] for d in self._departments}
+        self._details.clear()
+        self._detail_bytes = 0
+        self._version = version
+
+    @property
+    def version(self):
+        self._refresh()
+        return self._version
+
+    @property
+    def catalog(self):
+        """
+        The CompactCatalog of the current version.
+        """
+        self._refresh()
+        return self._catalog
+
+    def departments(self):
+        """
+        :return: List of dictionaries with Department names and Prefixes. Callers must not mutate it.
+        """
+        self._refresh()
+        return self._departments
+
+    def courses_by_department(self, department):
+        """
+        :return: List of course dictionaries for the department, materialized from the compact catalog.
+        """
+        self._refresh()
+        return self._catalog.courses_by_department(department)
+
+    def department_for_prefix(self, prefix):
+        """
+        :param prefix: Subject code prefix (e.g., 'ELE').
+        :return: Department name, or None.
+        """
+        self._refresh()
+        return self._department_by_prefix.get(prefix)
+
+    def course_details(self, pid):
+        """
+        Returns the full detail record for a PID, loading it from the store on a miss.
+        :return: Detail dictionary, or None if the PID is unknown.
+        """
+        self._refresh()
+        with self._lock:
+            entry = self._details.get(pid)
+            if entry is not None:
+                self._details.move_to_end(pid)
+                CACHE_LOOKUPS.inc(cache="course_details", result="hit")
+                return entry[0]
+        CACHE_LOOKUPS.inc(cache="course_details", result="miss")
+
+        raw = self.store.course_details(pid)
+        if raw is None:
+            return None
+        details = json.loads(raw)
+
+        with self._lock:
+            if pid not in self._details:
+                self._details[pid] = (details, len(raw))
+                self._detail_bytes += len(raw)
+                while self._detail_bytes > self.max_detail_bytes and len(self._details) > 1:
+                    _, (_, size) = self._details.popitem(last=False)
+                    self._detail_bytes -= size
+        return details
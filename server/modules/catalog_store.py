@@ -0,0 +1,198 @@
+import json
+import sqlite3
+import threading
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    pid TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    title TEXT,
+    course_code TEXT,
+    department TEXT,
+    prefix TEXT,
+    credits TEXT,
+    semester TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_courses_department ON courses (department);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class CatalogStore:
+    """
+    Local SQLite copy of the Kuali catalog.
+    Each thread gets its own connection; the database runs in WAL mode so request
+    threads keep reading while the background sync writes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Identifies this database; a new one gets a new ID even though its versions start over
+            conn.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('catalog_id', ?)", (uuid.uuid4().hex,))
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_state(self, key, default=None):
+        row = self._connect().execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def catalog_version(self):
+        """
+        Returns the catalog version, which is bumped every time a sync changes any course.
+        :return: Integer version, or 0 if the catalog has never been synced.
+        """
+        return int(self.get_state("catalog_version", 0))
+
+    def catalog_id(self):
+        """
+        :return: Random ID given to the database when it was created, as 32 hex digits.
+        """
+        return self.get_state("catalog_id")
+
+    def is_ready(self):
+        """
+        Returns True once at least one sync has completed.
+        """
+        return self.get_state("last_sync") is not None
+
+    def course_versions(self):
+        """
+        :return: Dictionary mapping every stored PID to its version fingerprint.
+        """
+        return dict(self._connect().execute("SELECT pid, version FROM courses"))
+
+    def apply_changes(self, upserts, removed_pids, synced_at):
+        """
+        Writes one sync's diff in a single transaction.
+        :param upserts: List of course dictionaries (see course_scraper.sync_catalog).
+        :param removed_pids: PIDs that are no longer in the remote catalog.
+        :param synced_at: Timestamp of the sync.
+        """
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO courses
+                    (pid, version, title, course_code, department, prefix, credits, semester, details)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (pid) DO UPDATE SET
+                    version = excluded.version, title = excluded.title,
+                    course_code = excluded.course_code, department = excluded.department,
+                    prefix = excluded.prefix, credits = excluded.credits,
+                    semester = excluded.semester, details = excluded.details
+                """,
+                [
+                    (
+                        course["pid"],
+                        course["version"],
+                        course["title"],
+                        course["course_code"],
+                        course["department"],
+                        course["prefix"],
+                        json.dumps(course["credits"]),
+                        json.dumps(course["semester"]),
+                        json.dumps(course["details"]),
+                    )
+                    for course in upserts
+                ],
+            )
+            conn.executemany("DELETE FROM courses WHERE pid = ?", [(pid,) for pid in removed_pids])
+            if upserts or removed_pids:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('catalog_version', ?)",
+                    (str(self.catalog_version() + 1),),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('last_sync', ?)",
+                (str(synced_at),),
+            )
+
+    def departments(self):
+        """
+        :return: List of dictionaries with Department names and Prefixes.
+        """
+        rows = self._connect().execute(
+            """
+            SELECT department, prefix FROM courses
+            WHERE department IS NOT NULL AND prefix IS NOT NULL
+            GROUP BY department
+            ORDER BY MIN(rowid)
+            """
+        )
+        return [{"Department": name, "Prefix": prefix} for name, prefix in rows]
+
+    def all_courses(self):
+        """
+        :return: List of (pid, department, prefix, course dictionary) tuples in catalog order.
+        """
+        rows = self._connect().execute(
+            "SELECT pid, department, prefix, title, course_code, credits, semester FROM courses ORDER BY rowid"
+        )
+        return [
+            (
+                pid,
+                department,
+                prefix,
+                {
+                    "Course Name": title,
+                    "Course Code": course_code,
+                    "Credits": json.loads(credits),
+                    "Semester": json.loads(semester),
+                },
+            )
+            for pid, department, prefix, title, course_code, credits, semester in rows
+        ]
+
+    def course_details(self, pid):
+        """
+        :return: Raw detail JSON text stored for the PID, or None.
+        """
+        row = self._connect().execute("SELECT details FROM courses WHERE pid = ?", (pid,)).fetchone()
+        return row[0] if row else None
+
+    def course_descriptions(self, department):
+        """
+        :return: Dictionary mapping the PIDs of a department to the description in their detail record.
+        """
+        rows = self._connect().execute(
+            "SELECT pid, json_extract(details, '$.description') FROM courses WHERE department = ?",
+            (department,),
+        )
+        return dict(rows)
+
+    def courses_by_department(self, department):
+        """
+        :param department: Department name (e.g., 'Electrical Engineering').
+        :return: List of course dictionaries in the shape served by /get_courses.
+        """
+        rows = self._connect().execute(
+            """
+            SELECT title, course_code, credits, semester FROM courses
+            WHERE department = ?
+            ORDER BY rowid
+            """,
+            (department,),
+        )
+        return [
+            {
+                "Course Name": title,
+                "Course Code": course_code,
+                "Credits": json.loads(credits),
+                "Semester": json.loads(semester),
+            }
+            for title, course_code, credits, semester in rows
+        ]
@@ -0,0 +1,242 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+SNAPSHOT_MAGIC = b"PCPCAT03"
+# Magic, catalog database ID, catalog version, row count, string count, then the string blob size
+SNAPSHOT_HEADER = struct.Struct("<8s16sqIIQ")
+# Sections start on multiples of this so the mapped arrays are aligned
+SNAPSHOT_ALIGNMENT = 8
+COLUMNS = ("pid", "department", "prefix", "title", "code", "credits", "semester")
+
+class StringTable:
+    """
+    Interns strings into one list so that every distinct value is stored once and rows
+    refer to it by index.
+    """
+
+    def __init__(self, strings=None):
+        self.strings = list(strings or [])
+        self._ids = {string: i for i, string in enumerate(self.strings)}
+
+    def add(self, string):
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(sys.intern(string))
+            self._ids[string] = string_id
+        return string_id
+
+class MappedStrings:
+    """
+    Read-only sequence over the string table of a snapshot buffer. Strings are decoded on
+    access, so a memory-mapped snapshot is shared by every process that maps it instead
+    of being copied into each one.
+    """
+
+    def __init__(self, buffer, offsets, start):
+        """
+        :param buffer: memoryview of the whole snapshot.
+        :param offsets: Byte offsets of the strings within the blob, one more than the number of strings.
+        :param start: Position of the blob within the buffer.
+        """
+        self._buffer = buffer
+        self._offsets = offsets
+        self._start = start
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, string_id):
+        return str(self._buffer[self._start + self._offsets[string_id]:self._start + self._offsets[string_id + 1]], "utf-8")
+
+    def __iter__(self):
+        for string_id in range(len(self)):
+            yield self[string_id]
+
+def _padding(size):
+    return -size % SNAPSHOT_ALIGNMENT
+
+class CompactCatalog:
+    """
+    Columnar, read-only catalog. Each course is a row across parallel arrays of string-table
+    ids; departments, prefixes, credits and semesters repeat heavily and are stored once.
+    Credits and semesters keep their catalog JSON shape and are decoded once per distinct value.
+    Rows are materialized into the dictionaries served by /get_courses only when asked for.
+    """
+
+    def __init__(self, strings, columns, version=None, catalog_id=None):
+        """
+        :param strings: Sequence of every distinct value of the catalog; rows refer to them by index.
+        :param columns: Dictionary mapping each name in COLUMNS to an array("I") (or a memoryview cast to "I") of string ids.
+        :param version: Catalog version the rows belong to.
+        :param catalog_id: ID of the catalog database (32 hex digits, see CatalogStore.catalog_id()); versions only
+        count within one database.
+        """
+        self.version = version
+        self.catalog_id = catalog_id
+        self._strings = strings
+        self._columns = columns
+        self._decoded = {}
+        self._lock = threading.Lock()
+        self._rows_by_department = {}
+        for row, department_id in enumerate(columns["department"]):
+            self._rows_by_department.setdefault(department_id, array("I")).append(row)
+        self._department_ids = {self._strings[d]: d for d in self._rows_by_department}
+
+    @classmethod
+    def from_rows(cls, rows, version=None, catalog_id=None):
+        """
+        :param rows: (pid, department, prefix, course dictionary) tuples as returned by CatalogStore.all_courses().
+        """
+        strings = StringTable([""])
+        columns = {name: array("I") for name in COLUMNS}
+        for pid, department, prefix, course in rows:
+            columns["pid"].append(strings.add(pid))
+            columns["department"].append(strings.add(department or ""))
+            columns["prefix"].append(strings.add(prefix or ""))
+            columns["title"].append(strings.add(course.get("Course Name") or ""))
+            columns["code"].append(strings.add(course.get("Course Code") or ""))
+            columns["credits"].append(strings.add(json.dumps(course.get("Credits"), sort_keys=True)))
+            columns["semester"].append(strings.add(json.dumps(course.get("Semester"), sort_keys=True)))
+        return cls(strings.strings, columns, version, catalog_id)
+
+    def __len__(self):
+        return len(self._columns["pid"])
+
+    def _json_value(self, string_id):
+        value = self._decoded.get(string_id, self)
+        if value is self:
+            value = json.loads(self._strings[string_id])
+            with self._lock:
+                self._decoded[string_id] = value
+        return value
+
+    def course(self, row):
+        """
+        :return: Course dictionary in the shape served by /get_courses. Nested values are shared; do not mutate them.
+        """
+        columns = self._columns
+        return {
+            "Course Name": self._strings[columns["title"][row]] or None,
+            "Course Code": self._strings[columns["code"][row]] or None,
+            "Credits": self._json_value(columns["credits"][row]),
+            "Semester": self._json_value(columns["semester"][row]),
+        }
+
+    def departments(self):
+        """
+        :return: List of dictionaries with Department names and Prefixes, in catalog order.
+        """
+        prefixes = {}
+        for department_id, prefix_id in zip(self._columns["department"], self._columns["prefix"]):
+            if department_id and prefix_id:
+                prefixes[department_id] = prefix_id
+        return [{"Department": self._strings[d], "Prefix": self._strings[p]} for d, p in prefixes.items()]
+
+    def department_row_ids(self, department):
+        """
+        :return: Row numbers of the department's courses, in catalog order.
+        """
+        return self._rows_by_department.get(self._department_ids.get(department), ())
+
+    def courses_by_department(self, department):
+        return [self.course(row) for row in self.department_row_ids(department)]
+
+    def department_rows(self, department):
+        """
+        :return: List of (pid, course dictionary) pairs of the department, in catalog order.
+        """
+        return [(self._strings[self._columns["pid"][row]], self.course(row)) for row in self.department_row_ids(department)]
+
+    def row(self, row):
+        """
+        :return: (pid, department, prefix, course dictionary) of one row, like CatalogStore.all_courses().
+        """
+        columns = self._columns
+        return (
+            self._strings[columns["pid"][row]],
+            self._strings[columns["department"][row]] or None,
+            self._strings[columns["prefix"][row]] or None,
+            self.course(row),
+        )
+
+    def rows(self):
+        """
+        :return: (pid, department, prefix, course dictionary) tuples, like CatalogStore.all_courses().
+        """
+        for row in range(len(self)):
+            yield self.row(row)
+
+    def save(self, path):
+        """
+        Writes a binary snapshot: a fixed header, an array of byte offsets, the string table
+        as one UTF-8 blob, then every column as a raw array. Written to a temporary file
+        first so readers never see a partial snapshot; processes that mapped the previous
+        snapshot keep reading it until they load the new one.
+        """
+        encoded = [string.encode("utf-8") for string in self._strings]
+        offsets = array("Q", [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        blob = b"".join(encoded)
+
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC,
+                bytes.fromhex(self.catalog_id) if self.catalog_id else bytes(16),
+                self.version or 0,
+                len(self),
+                len(self._strings),
+                len(blob),
+            ))
+            file.write(offsets.tobytes())
+            file.write(blob + b"\0" * _padding(len(blob)))
+            for name in COLUMNS:
+                file.write(self._columns[name].tobytes())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a snapshot written by save(). The columns and strings are read straight
+        from the mapping, which the OS shares between all processes that load the same file.
+        :raises ValueError: If the file is not a catalog snapshot or is truncated.
+        """
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < SNAPSHOT_HEADER.size:
+                raise ValueError("Truncated catalog snapshot")
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(mapping)
+
+    @classmethod
+    def from_buffer(cls, data):
+        """
+        Opens a snapshot held in any buffer (bytes or mmap) without copying it.
+        """
+        buffer = memoryview(data)
+        if len(buffer) < SNAPSHOT_HEADER.size:
+            raise ValueError("Truncated catalog snapshot")
+        magic, catalog_id, version, count, string_count, blob_size = SNAPSHOT_HEADER.unpack_from(buffer)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a catalog snapshot")
+
+        position = SNAPSHOT_HEADER.size
+        offsets_size = (string_count + 1) * 8
+        blob_start = position + offsets_size
+        columns_start = blob_start + blob_size + _padding(blob_size)
+        if len(buffer) < columns_start + len(COLUMNS) * count * 4:
+            raise ValueError("Truncated catalog snapshot")
+
+        offsets = buffer[position:blob_start].cast("Q")
+        strings = MappedStrings(buffer, offsets, blob_start)
+        columns = {}
+        for i, name in enumerate(COLUMNS):
+            start = columns_start + i * count * 4
+            columns[name] = buffer[start:start + count * 4].cast("I")
+        return cls(strings, columns, version or None, catalog_id.hex() if any(catalog_id) else None)
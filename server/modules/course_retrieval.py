@@ -0,0 +1,119 @@
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+from modules.course_search import tokenize
+from modules.degree_rules import MIN_LEVEL, course_level, normalize_code
+from modules.plan_validator import REPEATABLE_CODES
+from modules.prompts import catalog_line
+from modules.sessions import estimate_tokens
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+# A title word counts as this many description words
+TITLE_WEIGHT = 3
+# The program of study counts this many times as much as the completed course names
+PROGRAM_WEIGHT = 2
+
+class CourseRetriever:
+    """
+    TF-IDF index over the courses of one department, so the plan prompt lists only the
+    courses relevant to a student instead of the whole department catalog.
+    Course titles and descriptions are tokenized once into a sparse matrix held as NumPy
+    arrays (row, column, weight) with sublinear term frequencies and L2-normalized rows;
+    a query is scored against every course with one vectorized pass.
+    """
+
+    def __init__(self, courses, descriptions=None, version=None):
+        """
+        :param courses: Course dictionaries as returned by get_courses_by_department().
+        :param descriptions: Optional list parallel to courses with their (HTML) catalog descriptions.
+        :param version: Catalog version the courses belong to.
+        """
+        self.version = version
+        self.courses = list(courses)
+        self._codes = [normalize_code(course.get("Course Code")) for course in self.courses]
+        # Only courses the rules allow in a plan are ranked
+        self._eligible = np.flatnonzero(np.array(
+            [(course_level(code) or 0) >= MIN_LEVEL for code in self._codes], dtype=bool
+        ))
+        self._vocabulary = {}
+        rows = []
+        columns = []
+        counts = []
+        for doc_id, course in enumerate(self.courses):
+            terms = Counter()
+            for token in tokenize(course.get("Course Name")):
+                terms[token] += TITLE_WEIGHT
+            if descriptions is not None:
+                terms.update(tokenize(TAG_PATTERN.sub(" ", str(descriptions[doc_id] or ""))))
+            for term, count in terms.items():
+                rows.append(doc_id)
+                columns.append(self._vocabulary.setdefault(term, len(self._vocabulary)))
+                counts.append(count)
+
+        self._rows = np.array(rows, dtype=np.int32)
+        self._columns = np.array(columns, dtype=np.int32)
+        document_frequency = np.bincount(self._columns, minlength=len(self._vocabulary))
+        self._idf = np.log((1 + len(self.courses)) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(np.array(counts, dtype=np.float64))) * self._idf[self._columns]
+        norms = np.sqrt(np.bincount(self._rows, weights=weights ** 2, minlength=len(self.courses)))
+        self._weights = (weights / np.maximum(norms[self._rows], 1e-12)).astype(np.float32)
+        # Prompt cost of each course, to report what listing only the retrieved ones saves
+        self._line_tokens = np.array([estimate_tokens(catalog_line(course)) for course in self.courses], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.courses)
+
+    def _query_vector(self, texts):
+        terms = Counter()
+        for text, weight in texts:
+            for token in tokenize(text):
+                terms[token] += weight
+        vector = np.zeros(len(self._vocabulary), dtype=np.float32)
+        for term, count in terms.items():
+            column = self._vocabulary.get(term)
+            if column is not None:
+                vector[column] = (1 + math.log(count)) * self._idf[column]
+        return vector
+
+    def scores(self, texts):
+        """
+        :param texts: List of (text, weight) pairs making up the query.
+        :return: Array with the relevance of every course to the query.
+        """
+        vector = self._query_vector(texts)
+        return np.bincount(self._rows, weights=self._weights * vector[self._columns], minlength=len(self.courses))
+
+    def top_k(self, program_of_study, completed_courses=(), k=40, pinned_codes=()):
+        """
+        Selects the courses to list in the prompt: the pinned ones, then the courses of at
+        least MIN_LEVEL most relevant to the program of study and the completed courses.
+        Completed courses are left out unless they may be repeated (seminars, thesis and dissertation).
+        :param completed_courses: Course dictionaries with "Course Name" and "Course Code".
+        :param pinned_codes: Codes always included, e.g. the seminar and dissertation courses the rules require.
+        :return: Dictionary with "courses" (in order of relevance), "prompt_tokens" (estimated
+        tokens of listing them) and "catalog_tokens" (estimated tokens of listing the whole department).
+        """
+        texts = [(program_of_study, PROGRAM_WEIGHT)]
+        texts.extend((course.get("Course Name"), 1) for course in completed_courses)
+        scores = self.scores(texts)
+
+        completed = {normalize_code(course.get("Course Code")) for course in completed_courses} - REPEATABLE_CODES
+        pinned = {normalize_code(code) for code in pinned_codes}
+        selected = [doc_id for doc_id, code in enumerate(self._codes) if code in pinned]
+        ranked = self._eligible[np.argsort(-scores[self._eligible], kind="stable")]
+        for doc_id in ranked:
+            if len(selected) >= k:
+                break
+            code = self._codes[doc_id]
+            if code not in completed and code not in pinned:
+                selected.append(int(doc_id))
+
+        return {
+            "courses": [self.courses[doc_id] for doc_id in selected],
+            "prompt_tokens": int(self._line_tokens[selected].sum()) if selected else 0,
+            "catalog_tokens": int(self._line_tokens.sum()),
+        }
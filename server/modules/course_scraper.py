@@ -1,4 +1,19 @@
-import requests
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from modules.catalog_index import CatalogIndex
+from modules.catalog_store import CatalogStore
+from modules.course_retrieval import CourseRetriever
+from modules.course_search import CourseSearchIndex
+from modules.fetch_engine import FetchEngine
+from modules.metrics import timed
+from modules.single_flight import SingleFlight
 
 BASE_URL = "https://uri.kuali.co/api/v1/catalog/courses/65269fc6daaf7e001cdeda4c"
 COURSE_DETAILS_URL = "https://uri.kuali.co/api/v1/catalog/course/65269fc6daaf7e001cdeda4c"
@@ -18,60 +33,282 @@ HEADERS = {
     "Sec-Fetch-Site": "cross-site",
 }
 
+# Detail fetches run in parallel over one keep-alive session
+FETCH_CONCURRENCY = 16
+KUALI_REQUESTS_PER_SECOND = 20
+FETCH_RETRIES = 3
+
+fetch_engine = FetchEngine(
+    headers=HEADERS,
+    max_workers=FETCH_CONCURRENCY,
+    rate_limits={"uri.kuali.co": KUALI_REQUESTS_PER_SECOND},
+    retries=FETCH_RETRIES,
+)
+
+# Local catalog store, refreshed in the background
+CATALOG_DB_PATH = os.environ.get(
+    "PCP_CATALOG_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "catalog.db"),
+)
+SYNC_INTERVAL_SECONDS = 6 * 60 * 60
+
+# With several server workers, only the one holding this lock syncs; the others retry it
+# every SYNC_LEADER_RETRY_SECONDS so a new leader takes over if the old one exits
+CATALOG_SYNC_LOCK_PATH = CATALOG_DB_PATH + ".sync-lock"
+SYNC_LEADER_RETRY_SECONDS = 60
+
+# Binary snapshot of the compact in-memory catalog, so restarts skip rebuilding it from the store
+CATALOG_SNAPSHOT_PATH = os.path.splitext(CATALOG_DB_PATH)[0] + ".snapshot"
+
+# Prompt retrieval indexes of the most recently used departments
+COURSE_RETRIEVER_CACHE_ENTRIES = 64
+
+# In-memory index over the store
+CATALOG_INDEX_TTL_SECONDS = 60
+CATALOG_DETAIL_CACHE_BYTES = 32 * 1024 * 1024
+
+catalog_store = CatalogStore(CATALOG_DB_PATH)
+catalog_index = CatalogIndex(
+    catalog_store,
+    ttl_seconds=CATALOG_INDEX_TTL_SECONDS,
+    max_detail_bytes=CATALOG_DETAIL_CACHE_BYTES,
+    snapshot_path=CATALOG_SNAPSHOT_PATH,
+)
+catalog_flight = SingleFlight()
+_sync_thread = None
+_catalog_ready = False
+_search_index = None
+_course_retrievers = OrderedDict()
+_course_retrievers_lock = threading.Lock()
+
+class CatalogNotReadyError(RuntimeError):
+    """Raised when the local catalog has not completed its first sync yet."""
+
 def fetch_all_courses():
     """Fetches all courses from the API."""
-    response = requests.get(BASE_URL, headers=HEADERS)
-    response.raise_for_status()
-    return response.json()
+    with timed("catalog_list_fetch"):
+        return fetch_engine.get_json(BASE_URL)
 
 def fetch_course_details(pid):
     """Fetches detailed information for a specific course using its PID."""
-    url = f"{COURSE_DETAILS_URL}/{pid}"
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
-    return response.json()
+    return fetch_engine.get_json(f"{COURSE_DETAILS_URL}/{pid}")
 
-def get_courses_by_department(department):
+def fetch_many_course_details(pids):
     """
-    Fetches and filters courses dynamically based on the selected department.
-    :param department: Department name to filter courses (e.g., 'Electrical Engineering').
+    Fetches detailed information for several courses concurrently.
+    :param pids: Iterable of course PIDs.
+    :return: Dictionary mapping each PID to its details, or to the exception raised for it.
     """
-    all_courses = fetch_all_courses()
+    urls = {pid: f"{COURSE_DETAILS_URL}/{pid}" for pid in pids}
+    with timed("catalog_details_fetch"):
+        results = fetch_engine.map_json(urls.values())
+    return {pid: results[url] for pid, url in urls.items()}
 
-    # Filter courses based on the department description
-    filtered_courses = [
-        course for course in all_courses
-        if course.get("subjectCode", {}).get("description") == department
-    ]
+def course_version(course):
+    """
+    Returns a fingerprint of a catalog entry so that a sync only re-fetches details for
+    courses whose PID is new or whose entry changed since the last sync.
+    """
+    encoded = json.dumps(course, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
 
-    # Fetch detailed information for each filtered course
-    detailed_courses = []
-    for course in filtered_courses:
+def sync_catalog():
+    """
+    Incrementally refreshes the local catalog store from the API.
+    Details are only fetched for new or changed PIDs; PIDs that disappeared are removed.
+    :return: Dictionary with the number of added/updated, removed and failed courses.
+    """
+    # Concurrent callers (e.g. a manual sync during the periodic one) share a single download
+    return catalog_flight.do("sync", _sync_catalog)
+
+def _sync_catalog():
+    with timed("catalog_sync"):
+        return _sync_catalog_changes()
+
+def _sync_catalog_changes():
+    all_courses = fetch_all_courses()
+    local_versions = catalog_store.course_versions()
+
+    remote_courses = {}
+    for course in all_courses:
         pid = course.get("pid")
         if pid:
-            course_details = fetch_course_details(pid)
-            detailed_courses.append({
-                "Course Name": course.get("title"),
-                "Course Code": course.get("__catalogCourseId"),
-                "Credits": course_details.get("credits"),
-                "Semester": course_details.get("semester", "Unknown"),
-            })
+            remote_courses[pid] = course
+
+    changed = [
+        (pid, course, course_version(course))
+        for pid, course in remote_courses.items()
+        if local_versions.get(pid) != course_version(course)
+    ]
+    removed = [pid for pid in local_versions if pid not in remote_courses]
+
+    details = fetch_many_course_details(pid for pid, _, _ in changed)
+
+    upserts = []
+    failed = 0
+    for pid, course, version in changed:
+        course_details = details[pid]
+        if isinstance(course_details, Exception):
+            # Leave the stale row in place; the next sync retries it
+            print(f"Failed to fetch details for {pid}: {course_details}")
+            failed += 1
+            continue
+        subject = course.get("subjectCode", {})
+        upserts.append({
+            "pid": pid,
+            "version": version,
+            "title": course.get("title"),
+            "course_code": course.get("__catalogCourseId"),
+            "department": subject.get("description"),
+            "prefix": subject.get("name"),
+            "credits": course_details.get("credits"),
+            "semester": course_details.get("semester", "Unknown"),
+            "details": course_details,
+        })
+
+    with timed("catalog_store_write"):
+        catalog_store.apply_changes(upserts, removed, time.time())
+    catalog_index.invalidate()
+    if upserts or removed:
+        # Publish the new snapshot now, so the other workers map it instead of rebuilding it
+        catalog_index.catalog
+    return {"updated": len(upserts), "removed": len(removed), "failed": failed}
+
+def _acquire_sync_lock(lock_path):
+    """
+    :return: The open lock file if this process now holds the sync lock, otherwise None.
+    """
+    lock_file = open(lock_path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
 
-    return detailed_courses
+def start_catalog_sync(interval=SYNC_INTERVAL_SECONDS, lock_path=None):
+    """
+    Starts a daemon thread that syncs the catalog immediately and then every `interval` seconds.
+    Calling it more than once has no effect.
+    :param lock_path: File to elect a single syncing process with when several workers share
+    the store; the lock is released by the OS when its holder exits.
+    """
+    global _sync_thread
+
+    if _sync_thread is not None:
+        return _sync_thread
+
+    def run():
+        if lock_path:
+            lock_file = _acquire_sync_lock(lock_path)
+            while lock_file is None:
+                time.sleep(SYNC_LEADER_RETRY_SECONDS)
+                lock_file = _acquire_sync_lock(lock_path)
+            print(f"Worker {os.getpid()} is syncing the catalog")
+        while True:
+            try:
+                result = sync_catalog()
+                print(f"Catalog sync finished: {result}")
+            except Exception:
+                traceback.print_exc()
+            time.sleep(interval)
+
+    _sync_thread = threading.Thread(target=run, name="catalog-sync", daemon=True)
+    _sync_thread.start()
+    return _sync_thread
+
+def _require_catalog():
+    global _catalog_ready
+
+    if _catalog_ready:
+        return
+    _catalog_ready = catalog_store.is_ready()
+    if not _catalog_ready:
+        raise CatalogNotReadyError("Course catalog is still syncing, please retry shortly")
+
+def get_courses_by_department(department):
+    """
+    Returns the courses of the selected department from the in-memory catalog index.
+    :param department: Department name to filter courses (e.g., 'Electrical Engineering').
+    """
+    _require_catalog()
+    return catalog_flight.do(("courses", department), catalog_index.courses_by_department, department)
 
 def get_departments():
     """
-    Extracts unique departments and their subject code prefixes from the API.
+    Returns the unique departments and their subject code prefixes from the in-memory catalog index.
     :return: List of dictionaries with Department names and Prefixes.
     """
-    all_courses = fetch_all_courses()
-    departments = {}
-    for course in all_courses:
-        subject = course.get("subjectCode", {})
-        department_name = subject.get("description")
-        subject_code = subject.get("name")
-        if department_name and subject_code:
-            departments[department_name] = subject_code
+    _require_catalog()
+    return catalog_flight.do("departments", catalog_index.departments)
+
+def get_course_details(pid):
+    """
+    Returns the full Kuali detail record of a course from the in-memory catalog index.
+    :param pid: Course PID.
+    """
+    _require_catalog()
+    return catalog_index.course_details(pid)
+
+def get_department_for_prefix(prefix):
+    """
+    Returns the department a subject code prefix belongs to, from the in-memory catalog index.
+    :param prefix: Subject code prefix (e.g., 'ELE').
+    :return: Department name, or None.
+    """
+    _require_catalog()
+    return catalog_index.department_for_prefix(prefix)
+
+def get_catalog_version():
+    """
+    Returns the version of the local catalog; it changes whenever a sync applies changes.
+    """
+    _require_catalog()
+    return catalog_index.version
 
-    # Convert to list of dictionaries
-    return [{"Department": name, "Prefix": prefix} for name, prefix in departments.items()]
+def _build_search_index(version):
+    global _search_index
+
+    with timed("search_index_build"):
+        _search_index = CourseSearchIndex(catalog_index.catalog, version)
+    return _search_index
+
+def get_search_index():
+    """
+    Returns the course search index for the current catalog version, rebuilding it after a sync.
+    """
+    _require_catalog()
+    version = catalog_index.version
+    index = _search_index
+    if index is None or index.version != version:
+        index = catalog_flight.do(("search_index", version), _build_search_index, version)
+    return index
+
+def _build_course_retriever(department, version):
+    rows = catalog_index.catalog.department_rows(department)
+    # One query for the department, instead of loading every detail record through the detail cache
+    descriptions = catalog_store.course_descriptions(department) if rows else {}
+    with timed("course_retriever_build"):
+        retriever = CourseRetriever(
+            [course for _, course in rows],
+            [descriptions.get(pid) for pid, _ in rows],
+            version,
+        )
+    # Unknown departments are cached too (as empty indexes), so repeating them costs nothing
+    with _course_retrievers_lock:
+        _course_retrievers[department] = retriever
+        _course_retrievers.move_to_end(department)
+        while len(_course_retrievers) > COURSE_RETRIEVER_CACHE_ENTRIES:
+            _course_retrievers.popitem(last=False)
+    return retriever
+
+def get_course_retriever(department):
+    """
+    Returns the prompt retrieval index over a department's courses for the current catalog version.
+    """
+    _require_catalog()
+    version = catalog_index.version
+    retriever = _course_retrievers.get(department)
+    if retriever is None or retriever.version != version:
+        retriever = catalog_flight.do(("course_retriever", department, version), _build_course_retriever, department, version)
+    return retriever
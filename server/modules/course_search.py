@@ -0,0 +1,236 @@
+import base64
+import bisect
+import json
+import math
+import re
+from array import array
+
+from modules.degree_rules import course_level, course_prefix, normalize_code, parse_credits
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {"a", "an", "and", "for", "in", "of", "on", "the", "to", "with"}
+
+# Query words at least this long also match catalog words one edit away
+FUZZY_MIN_LENGTH = 4
+# The last query word also matches catalog words it is a prefix of, as the user types
+PREFIX_MIN_LENGTH = 2
+
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.6
+FUZZY_WEIGHT = 0.5
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor is malformed or belongs to an older catalog version."""
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(str(text or "").casefold()) if token not in STOP_WORDS]
+
+def credit_range(value):
+    """
+    :return: Tuple of (minimum, maximum) credits of a catalog entry, or (None, None).
+    """
+    if isinstance(value, dict) and isinstance(value.get("credits"), dict):
+        bounds = value["credits"]
+        low = parse_credits(bounds.get("min"))
+        high = parse_credits(bounds.get("max"), low)
+        return low, high
+    credits = parse_credits(value)
+    return credits, credits
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+def _one_edit_apart(a, b):
+    """
+    True if b differs from a by one insertion, deletion, substitution or adjacent transposition.
+    """
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diffs) == 1 or (
+            len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+        )
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    i = 0
+    while i < len(shorter) and shorter[i] == longer[i]:
+        i += 1
+    return shorter[i:] == longer[i + 1:]
+
+class CourseSearchIndex:
+    """
+    Inverted index over one version of the catalog. Titles, course codes ("ele", "500" and
+    "ele500"), subject prefixes and department names are tokenized once; a query word
+    matches exactly, as a prefix (last word only) or within one edit (via a deletion
+    index). Every query word must match; results are ranked by inverse document frequency.
+    Documents are row numbers of the CompactCatalog, and only the courses of the returned
+    page are materialized, so the index adds little to the shared catalog snapshot.
+    """
+
+    def __init__(self, catalog, version=None):
+        """
+        :param catalog: CompactCatalog to index.
+        :param version: Catalog version the rows belong to; cursors from other versions are rejected.
+        """
+        self.version = version
+        self.catalog = catalog
+        # Numeric columns; -1 and NaN stand for an unknown level or credit count
+        self._levels = array("i")
+        self._min_credits = array("d")
+        self._max_credits = array("d")
+        self._rows_by_prefix = {}
+        postings = {}
+        codes = []
+        for doc_id, (pid, department, prefix, course) in enumerate(catalog.rows()):
+            code = normalize_code(course.get("Course Code"))
+            codes.append(course.get("Course Code") or "")
+            level = course_level(code)
+            low, high = credit_range(course.get("Credits"))
+            self._levels.append(-1 if level is None else level)
+            self._min_credits.append(math.nan if low is None else low)
+            self._max_credits.append(math.nan if high is None else high)
+            self._rows_by_prefix.setdefault(course_prefix(code), array("I")).append(doc_id)
+
+            tokens = set(tokenize(course.get("Course Name")))
+            tokens.update(tokenize(code))
+            tokens.update(tokenize(department))
+            compact_code = code.replace(" ", "").casefold()
+            if compact_code:
+                tokens.add(compact_code)
+            if prefix:
+                tokens.add(prefix.casefold())
+            for token in tokens:
+                postings.setdefault(token, array("I")).append(doc_id)
+
+        self._postings = postings
+        # Position of each row when sorted by course code, the tie-breaker of equal scores
+        self._code_ranks = array("I", bytes(4 * len(codes)))
+        for rank, doc_id in enumerate(sorted(range(len(codes)), key=codes.__getitem__)):
+            self._code_ranks[doc_id] = rank
+
+        self._vocabulary = sorted(postings)
+        deletions = {}
+        for term in self._vocabulary:
+            if len(term) >= FUZZY_MIN_LENGTH - 1 and not term.isdigit():
+                for deleted in _deletes(term):
+                    deletions.setdefault(deleted, []).append(term)
+        self._deletions = {deleted: tuple(terms) for deleted, terms in deletions.items()}
+
+    def __len__(self):
+        return len(self._levels)
+
+    def _idf(self, term):
+        return math.log(1 + len(self) / len(self._postings[term]))
+
+    def _fuzzy_terms(self, word):
+        candidates = set(self._deletions.get(word, ()))
+        for deleted in _deletes(word):
+            if deleted in self._postings:
+                candidates.add(deleted)
+            candidates.update(self._deletions.get(deleted, ()))
+        return {term for term in candidates if _one_edit_apart(word, term)}
+
+    def _prefix_terms(self, word):
+        start = bisect.bisect_left(self._vocabulary, word)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(word):
+                break
+            terms.append(term)
+        return terms
+
+    def _word_scores(self, word, is_last):
+        """
+        :return: Dictionary mapping each document that matches the query word to its score.
+        """
+        matches = {}
+        if word in self._postings:
+            matches[word] = EXACT_WEIGHT
+        if is_last and len(word) >= PREFIX_MIN_LENGTH:
+            for term in self._prefix_terms(word):
+                matches.setdefault(term, PREFIX_WEIGHT)
+        if len(word) >= FUZZY_MIN_LENGTH and not word.isdigit():
+            for term in self._fuzzy_terms(word):
+                matches.setdefault(term, FUZZY_WEIGHT)
+
+        scores = {}
+        for term, weight in matches.items():
+            score = weight * self._idf(term)
+            for doc_id in self._postings[term]:
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def _matches_filters(self, doc_id, min_level, max_level, credits):
+        level = self._levels[doc_id]
+        if min_level is not None and (level < 0 or level < min_level):
+            return False
+        if max_level is not None and (level < 0 or level > max_level):
+            return False
+        # Comparisons with NaN are false, so courses without credits never match
+        if credits is not None and not self._min_credits[doc_id] <= credits <= self._max_credits[doc_id]:
+            return False
+        return True
+
+    def _course(self, doc_id):
+        pid, department, _, course = self.catalog.row(doc_id)
+        return dict(course, **{"Department": department, "PID": pid})
+
+    def search(self, query="", department=None, prefix=None, min_level=None, max_level=None, credits=None,
+               limit=20, cursor=None):
+        """
+        :param query: Free text; an empty query lists every course that passes the filters.
+        :param min_level: Lowest course number, e.g. 500 for graduate courses.
+        :param credits: Only courses that can be taken for this many credits.
+        :param cursor: "next_cursor" of the previous page.
+        :return: Dictionary with "results" (course dictionaries), "total" and "next_cursor" (None on the last page).
+        :raises InvalidCursorError: If the cursor is malformed or from another catalog version.
+        """
+        offset = self._decode_cursor(cursor) if cursor else 0
+
+        words = tokenize(query)
+        is_typing = bool(words) and not str(query).endswith(" ")
+        if words:
+            scores = None
+            for i, word in enumerate(words):
+                word_scores = self._word_scores(word, is_typing and i == len(words) - 1)
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {doc_id: score + word_scores[doc_id] for doc_id, score in scores.items() if doc_id in word_scores}
+                if not scores:
+                    break
+        else:
+            scores = dict.fromkeys(range(len(self)), 0.0)
+
+        candidates = scores
+        if department is not None:
+            candidates = set(self.catalog.department_row_ids(department)).intersection(candidates)
+        if prefix is not None:
+            candidates = set(self._rows_by_prefix.get(prefix.upper(), ())).intersection(candidates)
+        code_ranks = self._code_ranks
+        ranked = sorted(
+            (doc_id for doc_id in candidates if self._matches_filters(doc_id, min_level, max_level, credits)),
+            key=lambda doc_id: (-scores[doc_id], code_ranks[doc_id]),
+        )
+        page = ranked[offset:offset + limit]
+        next_offset = offset + len(page)
+        return {
+            "results": [self._course(doc_id) for doc_id in page],
+            "total": len(ranked),
+            "next_cursor": self._encode_cursor(next_offset) if next_offset < len(ranked) else None,
+        }
+
+    def _encode_cursor(self, offset):
+        encoded = json.dumps({"version": self.version, "offset": offset}, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(encoded).decode("ascii").rstrip("=")
+
+    def _decode_cursor(self, cursor):
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            offset = int(state["offset"])
+        except (ValueError, KeyError, TypeError):
+            raise InvalidCursorError("Invalid cursor")
+        if state.get("version") != self.version:
+            raise InvalidCursorError("The catalog changed since this cursor was issued; start the search again")
+        return max(0, offset)
@@ -0,0 +1,106 @@
+import re
+
+# Ph.D. in Electrical Engineering, as stated in prompts.INITIAL_RULES
+TOTAL_CREDITS = 72
+MS_CREDITS = 30
+POST_MS_CREDITS = TOTAL_CREDITS - MS_CREDITS
+MIN_POST_MS_COURSEWORK = 18
+MIN_MS_ELE_COURSEWORK = 16
+MIN_LEVEL = 500
+
+DISSERTATION_CODE = "ELE 699"
+DISSERTATION_MIN = 18
+DISSERTATION_MAX = 24
+DISSERTATION_PER_SEMESTER = 8
+
+THESIS_CODE = "ELE 599"
+THESIS_CREDITS = 6
+
+SEMINAR_CODES = ("ELE 601", "ELE 602")
+FALL_SEMINAR_CODE = "ELE 601"
+MIN_SEMINAR_CREDITS = 2
+SEMINAR_CREDITS = 1
+
+SPECIAL_PROBLEM_CODES = ("ELE 591", "ELE 592", "ELE 691", "ELE 692")
+SPECIAL_TOPIC_CODES = ("ELE 594", "ELE 694")
+MAX_SPECIAL_PROBLEM_CREDITS = 3
+MAX_SPECIAL_CREDITS = 9
+
+# Credits a full-time graduate student takes per semester, seminar excluded
+FULL_TIME_CREDITS = 9
+
+COURSE_CODE_PATTERN = re.compile(r"([A-Za-z]{2,4})\s*(\d{3})")
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+def normalize_code(code):
+    """
+    Normalizes a course code to "PREFIX NUMBER" (e.g., 'ele509' -> 'ELE 509').
+    :return: The normalized code, or the stripped input if it does not look like a course code.
+    """
+    match = COURSE_CODE_PATTERN.search(str(code or ""))
+    if not match:
+        return str(code or "").strip()
+    return f"{match.group(1).upper()} {match.group(2)}"
+
+def course_level(code):
+    """
+    :return: The course number (e.g., 509 for 'ELE 509'), or None.
+    """
+    match = COURSE_CODE_PATTERN.search(str(code or ""))
+    return int(match.group(2)) if match else None
+
+def course_prefix(code):
+    match = COURSE_CODE_PATTERN.search(str(code or ""))
+    return match.group(1).upper() if match else None
+
+def parse_credits(value, default=None):
+    """
+    Reads a credit count from the shapes found in the catalog and in client payloads:
+    integers, strings such as "3" or "1-6", and Kuali dictionaries such as
+    {"credits": {"min": 3, "max": 3}} or {"value": 3}. Ranges resolve to their minimum.
+    """
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = NUMBER_PATTERN.search(value)
+        return int(float(match.group(0))) if match else default
+    if isinstance(value, dict):
+        for key in ("value", "min", "credits", "max"):
+            if key in value:
+                credits = parse_credits(value[key])
+                if credits is not None:
+                    return credits
+    return default
+
+def credit_targets(completed_courses, masters_completed):
+    """
+    Credits a plan still has to cover, by part of the degree. The solver plans exactly these
+    and the validator requires them, so both count completed courses the same way.
+    :param completed_courses: Course dictionaries with "Course Code" and "Credits".
+    :return: Dictionary with "ms_coursework", "thesis", "dissertation" and "post_ms_coursework" credits.
+    """
+    completed_credits = completed_dissertation = completed_thesis = completed_seminar = 0
+    for course in completed_courses:
+        code = normalize_code(course.get("Course Code"))
+        credits = parse_credits(course.get("Credits"), 0)
+        completed_credits += credits
+        if code == DISSERTATION_CODE:
+            completed_dissertation += credits
+        elif code == THESIS_CODE:
+            completed_thesis += credits
+        elif code in SEMINAR_CODES:
+            completed_seminar += credits
+
+    # The M.S. part (coursework + thesis), then the 42 credits beyond it: dissertation and coursework
+    completed_coursework = completed_credits - completed_dissertation - completed_seminar
+    ms_remaining = 0 if masters_completed else max(0, MS_CREDITS - completed_coursework)
+    thesis = 0 if masters_completed else min(max(0, THESIS_CREDITS - completed_thesis), ms_remaining)
+    extra_coursework = 0 if masters_completed else max(0, completed_coursework - MS_CREDITS)
+    return {
+        "ms_coursework": ms_remaining - thesis,
+        "thesis": thesis,
+        "dissertation": max(0, DISSERTATION_MIN - completed_dissertation),
+        "post_ms_coursework": max(0, POST_MS_CREDITS - DISSERTATION_MIN - extra_coursework),
+    }
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.metrics import UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests per second go to one host.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class FetchEngine:
+    """
+    Bounded-concurrency HTTP fetcher over a shared keep-alive session.
+    Requests are rate limited per host and retried with exponential backoff on
+    connection errors and retryable status codes.
+    """
+
+    def __init__(self, headers=None, max_workers=8, rate_limits=None, default_rate=20,
+                 retries=3, backoff=0.5, timeout=30):
+        """
+        :param headers: Headers sent with every request.
+        :param max_workers: Number of requests allowed in flight at once.
+        :param rate_limits: Dictionary mapping host name to requests per second.
+        :param default_rate: Requests per second for hosts not in rate_limits.
+        :param retries: Number of retries after the first attempt.
+        :param backoff: Base delay in seconds, doubled on every retry.
+        :param timeout: Per-request timeout in seconds.
+        """
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.default_rate = default_rate
+        self.rate_limits = dict(rate_limits or {})
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+
+    def _limiter(self, url):
+        host = urlsplit(url).hostname
+        with self._limiters_lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = RateLimiter(self.rate_limits.get(host, self.default_rate))
+                self._limiters[host] = limiter
+            return limiter
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+
+    def get(self, url, **kwargs):
+        """
+        Performs a GET with rate limiting and retries.
+        :return: The successful requests.Response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).hostname
+        limiter = self._limiter(url)
+        for attempt in range(self.retries + 1):
+            limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                UPSTREAM_REQUESTS.inc(upstream=host, outcome="connection_error")
+                if attempt == self.retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, upstream=host)
+            UPSTREAM_REQUESTS.inc(upstream=host, outcome=str(response.status_code))
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.retries:
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+            response.raise_for_status()
+            return response
+
+    def get_json(self, url, **kwargs):
+        return self.get(url, **kwargs).json()
+
+    def map_json(self, urls):
+        """
+        Fetches many URLs concurrently.
+        :param urls: Iterable of URLs.
+        :return: Dictionary mapping each URL to its decoded JSON, or to the exception raised.
+        """
+        futures = {url: self._executor.submit(self.get_json, url) for url in urls}
+        results = {}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                results[url] = e
+        return results
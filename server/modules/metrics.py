@@ -0,0 +1,316 @@
+import glob
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a cached lookup up to a full model generation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+
+# With several server workers, each one writes its values to a file in this directory and
+# render() adds up the files of all workers, so a scrape does not depend on which worker serves it.
+# Files of exited workers are kept so counters never go backwards; their gauges are left out.
+MULTIPROCESS_DIR = os.environ.get("PCP_METRICS_DIR")
+FLUSH_INTERVAL_SECONDS = 5
+
+_registry = []
+_flush_thread = None
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """
+    Base of the metric types: a name, a help text and a set of label names.
+    Every metric registers itself for render().
+    """
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def values(self):
+        """
+        :return: Dictionary mapping label values to the value of this process.
+        """
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def combine(value, other):
+        """
+        :return: The value of two processes added up.
+        """
+        return value + other
+
+    def samples(self, values):
+        """
+        :return: List of (suffix, label values, extra labels, value) in exposition order.
+        """
+        return [("", key, None, value) for key, value in sorted(values.items())]
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples(self.values() if values is None else values):
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """
+    A value read from `callback` at scrape time. The callback returns a number, or a
+    dictionary mapping the value of the single label to a number.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, callback, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+
+    def values(self):
+        value = self.callback()
+        if isinstance(value, dict):
+            return {(str(label),): number for label, number in value.items()}
+        return {(): value}
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the block in seconds, also when it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def values(self):
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+    @staticmethod
+    def combine(value, other):
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1], value[2] + other[2]]
+
+    def samples(self, values):
+        samples = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, {"le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", key, None, total))
+            samples.append(("_count", key, None, count))
+        return samples
+
+def _process_values():
+    return {metric.name: metric.values() for metric in _registry}
+
+def _worker_path(pid):
+    return os.path.join(MULTIPROCESS_DIR, f"{pid}.json")
+
+def flush():
+    """
+    Writes the values of this process to its file in MULTIPROCESS_DIR.
+    """
+    if not MULTIPROCESS_DIR:
+        return
+    values = {name: [[list(key), value] for key, value in metric_values.items()] for name, metric_values in _process_values().items()}
+    path = _worker_path(os.getpid())
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(values, file)
+    os.replace(temp_path, path)
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _all_workers_values():
+    """
+    Adds the files of the other workers to the values of this process.
+    """
+    values = _process_values()
+    metrics = {metric.name: metric for metric in _registry}
+    for path in glob.glob(os.path.join(MULTIPROCESS_DIR, "*.json")):
+        pid = int(os.path.splitext(os.path.basename(path))[0])
+        if pid == os.getpid():
+            continue
+        try:
+            with open(path, encoding="utf-8") as file:
+                worker_values = json.load(file)
+        except (OSError, ValueError):
+            continue
+        alive = None
+        for name, samples in worker_values.items():
+            metric = metrics.get(name)
+            if metric is None:
+                continue
+            if isinstance(metric, Gauge):
+                alive = _is_alive(pid) if alive is None else alive
+                if not alive:
+                    continue
+            for key, value in samples:
+                key = tuple(key)
+                values[name][key] = metric.combine(values[name][key], value) if key in values[name] else value
+    return values
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            flush()
+        except OSError as e:
+            print(f"Failed to write metrics: {e}")
+
+def start_flush():
+    """
+    Starts writing this process's values to MULTIPROCESS_DIR in the background, so scrapes
+    served by other workers include them. Does nothing without a MULTIPROCESS_DIR.
+    """
+    global _flush_thread
+
+    if not MULTIPROCESS_DIR or _flush_thread is not None:
+        return
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+    _flush_thread = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+    _flush_thread.start()
+
+def clear_workers():
+    """
+    Removes the files of earlier runs from MULTIPROCESS_DIR; call once before the workers start.
+    """
+    if not MULTIPROCESS_DIR:
+        return
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(MULTIPROCESS_DIR, "*.json")):
+        os.remove(path)
+
+def render():
+    """
+    :return: All registered metrics in the Prometheus text exposition format, added up over
+    the workers when MULTIPROCESS_DIR is set.
+    """
+    values = _all_workers_values() if MULTIPROCESS_DIR else _process_values()
+    return "\n".join(metric.render(values[metric.name]) for metric in _registry) + "\n"
+
+# Metrics shared by the hot paths of the server and the catalog
+STAGE_SECONDS = Histogram(
+    "pcp_stage_seconds",
+    "Time spent in each stage of catalog sync and plan generation.",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "pcp_http_request_seconds",
+    "Time until the response of each endpoint is ready (streamed bodies continue after it).",
+    ["endpoint", "status"],
+)
+UPSTREAM_REQUESTS = Counter(
+    "pcp_upstream_requests_total",
+    "Requests sent to upstream services by host and outcome.",
+    ["upstream", "outcome"],
+)
+UPSTREAM_SECONDS = Histogram(
+    "pcp_upstream_request_seconds",
+    "Latency of single upstream requests by host.",
+    ["upstream"],
+)
+CACHE_LOOKUPS = Counter(
+    "pcp_cache_lookups_total",
+    "Cache lookups by cache and result.",
+    ["cache", "result"],
+)
+PLANS = Counter(
+    "pcp_plans_total",
+    "Plans served by how they were produced (solver, cache hit, shared generation or model).",
+    ["source"],
+)
+PLAN_ABORTS = Counter(
+    "pcp_plan_aborts_total",
+    "Model generations aborted early because the output went off-schema or over budget.",
+    ["reason"],
+)
+TOKENS_GENERATED = Counter(
+    "pcp_model_tokens_generated_total",
+    "Tokens generated by the model.",
+)
+PROMPT_EVAL_TOKENS = Counter(
+    "pcp_model_prompt_eval_tokens_total",
+    "Prompt tokens the model had to evaluate (excludes tokens served from its prefix cache).",
+)
+PROMPT_CHARS = Histogram(
+    "pcp_model_prompt_chars",
+    "Size of the prompts sent to the model in characters.",
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+PROMPT_CATALOG_TOKENS = Histogram(
+    "pcp_prompt_catalog_tokens",
+    "Estimated tokens of the catalog courses listed in each plan prompt.",
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000),
+)
+PROMPT_TOKENS_SAVED = Counter(
+    "pcp_prompt_retrieval_tokens_saved_total",
+    "Estimated prompt tokens saved by listing only the retrieved courses instead of the whole department.",
+)
+TOKENS_PER_SECOND = Histogram(
+    "pcp_model_tokens_per_second",
+    "Generation throughput of each model call.",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200),
+)
+
+def timed(stage):
+    """
+    Context manager timing one stage into pcp_stage_seconds.
+    """
+    return STAGE_SECONDS.time(stage=stage)
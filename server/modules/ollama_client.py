@@ -0,0 +1,145 @@
+import json
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.metrics import (
+    PROMPT_CHARS, PROMPT_EVAL_TOKENS, STAGE_SECONDS, TOKENS_GENERATED, TOKENS_PER_SECOND, UPSTREAM_REQUESTS,
+)
+
+# Ollama API URL
+OLLAMA_URL = "http://localhost:11434/api/chat"
+OLLAMA_MODEL = "llama3.3"
+
+# Keep the model (and its KV cache for the static prompt prefix) loaded between requests.
+# num_ctx must stay constant: changing it reloads the model and drops the cache.
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_OPTIONS = {"num_ctx": 8192}
+
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_maxsize=16))
+session.mount("https://", HTTPAdapter(pool_maxsize=16))
+
+class OllamaError(RuntimeError):
+    """Raised when the Ollama API answers with a non-200 status."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+def chat_payload(messages, stream=True, options=None, format=None):
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": dict(OLLAMA_OPTIONS, **(options or {})),
+    }
+    if format is not None:
+        payload["format"] = format
+    return payload
+
+def chat_stream(messages, options=None, format=None):
+    """
+    Sends a chat request and yields the decoded NDJSON chunks as they arrive.
+    The last chunk has "done": true and carries Ollama's timing statistics.
+    Closing the generator early closes the connection, which makes Ollama stop generating.
+    :param format: JSON schema the answer is constrained to (Ollama structured outputs), or None.
+    """
+    PROMPT_CHARS.observe(sum(len(message.get("content", "")) for message in messages))
+    started = time.perf_counter()
+    try:
+        response = session.post(
+            OLLAMA_URL,
+            json=chat_payload(messages, options=options, format=format),
+            stream=True,
+            headers={"Content-Type": "application/json"},
+        )
+    except requests.RequestException:
+        UPSTREAM_REQUESTS.inc(upstream="ollama", outcome="connection_error")
+        raise
+    UPSTREAM_REQUESTS.inc(upstream="ollama", outcome=str(response.status_code))
+    if response.status_code != 200:
+        response.close()
+        raise OllamaError("Failed to connect to Ollama API", response.status_code)
+
+    first_token = None
+    with response:
+        for chunk in response.iter_lines():
+            if chunk:
+                data = json.loads(chunk.decode("utf-8"))
+                if first_token is None:
+                    first_token = time.perf_counter()
+                    STAGE_SECONDS.observe(first_token - started, stage="model_first_token")
+                if data.get("done", False):
+                    STAGE_SECONDS.observe(time.perf_counter() - first_token, stage="model_generation")
+                    _record_usage(data)
+                yield data
+                if data.get("done", False):
+                    break
+
+def _record_usage(final):
+    generated = final.get("eval_count", 0)
+    TOKENS_GENERATED.inc(generated)
+    PROMPT_EVAL_TOKENS.inc(final.get("prompt_eval_count", 0))
+    if generated and final.get("eval_duration"):
+        TOKENS_PER_SECOND.observe(generated / (final["eval_duration"] / 1e9))
+
+def chat(messages, options=None):
+    """
+    Sends a chat request and collects the streamed answer.
+    :return: Tuple of (full response text, final chunk with timing statistics).
+    """
+    parts = []
+    final = {}
+    for data in chat_stream(messages, options=options):
+        parts.append(data.get("message", {}).get("content", ""))
+        if data.get("done", False):
+            final = data
+    return "".join(parts), final
+
+def warm_prefix(prefix_messages):
+    """
+    Loads the model and prefills the static prompt prefix so the first real request hits the cache.
+    """
+    chat(prefix_messages, options={"num_predict": 1})
+
+def _prefill_stats(final):
+    return {
+        "prompt_tokens": final.get("prompt_eval_count", 0),
+        "prefill_ms": final.get("prompt_eval_duration", 0) / 1e6,
+        "load_ms": final.get("load_duration", 0) / 1e6,
+    }
+
+def measure_prefill(prefix_messages, suffix_messages):
+    """
+    Measures prefill time of the same prompt with the prefix cache missed and hit.
+    The miss is forced by prepending a unique nonce, which changes the very first tokens.
+    :return: Dictionary with "miss" and "hit" statistics (prompt tokens evaluated and times in ms).
+    """
+    options = {"num_predict": 1}
+    nonce = {"role": "system", "content": f"Request {uuid.uuid4().hex}"}
+    _, miss = chat([nonce] + prefix_messages + suffix_messages, options=options)
+
+    warm_prefix(prefix_messages)
+    _, hit = chat(prefix_messages + suffix_messages, options=options)
+
+    return {"miss": _prefill_stats(miss), "hit": _prefill_stats(hit)}
+
+if __name__ == "__main__":
+    from modules.prompts import static_prefix_messages, student_details
+
+    example = {
+        "Department": "Electrical Engineering",
+        "Program of Study": "Machine Learning",
+        "Masters Completed": False,
+        "Completed Courses": [
+            {"Course Name": "Probability and Random Processes", "Course Code": "ELE 509", "Credits": "3"},
+        ],
+    }
+    report = measure_prefill(static_prefix_messages(), [{"role": "user", "content": student_details(example)}])
+    for name, stats in report.items():
+        print(f"cache {name}: {stats['prompt_tokens']} prompt tokens evaluated, "
+              f"prefill {stats['prefill_ms']:.1f} ms, load {stats['load_ms']:.1f} ms")
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from modules.degree_rules import parse_credits
+from modules.metrics import CACHE_LOOKUPS
+
+def _normalize_text(value):
+    return " ".join(str(value or "").split()).casefold()
+
+def _normalize_code(value):
+    return "".join(str(value or "").split()).upper()
+
+def normalize_payload(data):
+    """
+    Reduces a /generate_subjects payload to the fields that determine the plan, in canonical form.
+    Completed courses are identified by code (or name when the code is empty) and credits,
+    and sorted so that their order does not matter. Credits are read with parse_credits(),
+    like the solver and the validator do, so "3", "3.0" and 3 are the same request.
+    """
+    completed_courses = sorted(
+        (_normalize_code(course.get("Course Code")) or _normalize_text(course.get("Course Name")), parse_credits(course.get("Credits"), 0))
+        for course in data.get("Completed Courses") or []
+    )
+    return {
+        "Department": _normalize_text(data.get("Department")),
+        "Program of Study": _normalize_text(data.get("Program of Study")),
+        "Masters Completed": bool(data.get("Masters Completed", False)),
+        "Total Credits": parse_credits(data.get("Total Credits"), 0),
+        "Completed Courses": completed_courses,
+    }
+
+def plan_cache_key(data, namespace=""):
+    """
+    Content address of a plan request.
+    :param data: Payload sent by the client to /generate_subjects.
+    :param namespace: Anything else the plan depends on (model, prompt); changing it invalidates old entries.
+    :return: Hex SHA-256 digest.
+    """
+    canonical = json.dumps([namespace, normalize_payload(data)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class PlanCache:
+    """
+    Two-tier cache of generated plans: an in-memory LRU in front of an optional
+    directory of JSON files that survives restarts. Files expire after a TTL and the
+    oldest ones are removed once the directory holds more than max_disk_entries.
+    """
+
+    def __init__(self, max_entries=1024, disk_dir=None, max_disk_entries=10000, disk_ttl_seconds=30 * 24 * 60 * 60):
+        """
+        :param max_entries: Number of plans kept in memory.
+        :param disk_dir: Directory for the on-disk tier, or None to keep plans in memory only.
+        :param max_disk_entries: Number of plans kept on disk.
+        :param disk_ttl_seconds: How long a plan on disk is served after it was written.
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remember(self, key, plan):
+        self._entries[key] = plan
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        :return: The cached plan, or None.
+        """
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                CACHE_LOOKUPS.inc(cache="plan", result="hit")
+                return plan
+
+        if self.disk_dir:
+            try:
+                path = self._path(key)
+                if time.time() - os.path.getmtime(path) > self.disk_ttl_seconds:
+                    os.remove(path)
+                    plan = None
+                else:
+                    with open(path, encoding="utf-8") as file:
+                        plan = json.load(file)
+            except (OSError, ValueError):
+                plan = None
+            if plan is not None:
+                with self._lock:
+                    self._remember(key, plan)
+                    self.stats["disk_hits"] += 1
+                CACHE_LOOKUPS.inc(cache="plan", result="disk_hit")
+                return plan
+
+        with self._lock:
+            self.stats["misses"] += 1
+        CACHE_LOOKUPS.inc(cache="plan", result="miss")
+        return None
+
+    def put(self, key, plan):
+        with self._lock:
+            self._remember(key, plan)
+            self.stats["stores"] += 1
+
+        if self.disk_dir:
+            # Write to a temporary file first so readers never see a partial plan
+            path = self._path(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    json.dump(plan, file)
+                os.replace(temp_path, path)
+                self._prune_disk()
+            except OSError as e:
+                # The disk tier is best-effort; the plan is still cached in memory
+                print(f"Failed to write plan cache entry: {e}")
+
+    def _prune_disk(self):
+        """
+        Removes expired plans from disk, then the oldest ones beyond max_disk_entries.
+        """
+        entries = []
+        with os.scandir(self.disk_dir) as files:
+            for entry in files:
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        entries.sort()
+        expired_before = time.time() - self.disk_ttl_seconds
+        excess = len(entries) - self.max_disk_entries
+        for i, (modified, path) in enumerate(entries):
+            if i >= excess and modified >= expired_before:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
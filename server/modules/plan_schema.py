@@ -0,0 +1,136 @@
+import re
+
+from modules.plan_stream import PlanStreamParser
+
+# Budgets a plan must stay within while it streams; generation is aborted as soon as one is exceeded
+MAX_PLAN_SEMESTERS = 12
+MAX_COURSES_PER_SEMESTER = 8
+MAX_COURSE_CREDITS = 12
+MAX_PREAMBLE_CHARS = 200
+MAX_SEMESTER_CHARS = 2500
+# Hard cap on generated tokens, passed to Ollama as num_predict
+MAX_PLAN_TOKENS = 3000
+
+SEMESTER_NAME = re.compile(r"Semester \d{1,2}")
+
+COURSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Course Name": {"type": "string"},
+        "Course Code": {"type": "string"},
+        "Credits": {"type": "integer"},
+    },
+    "required": ["Course Name", "Course Code", "Credits"],
+    "additionalProperties": False,
+}
+
+SEMESTER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Total Credits": {"type": "integer"},
+        "Courses": {"type": "array", "items": COURSE_SCHEMA, "maxItems": MAX_COURSES_PER_SEMESTER},
+    },
+    "required": ["Total Credits", "Courses"],
+    "additionalProperties": False,
+}
+
+# Sent to Ollama as "format" so decoding is constrained to this shape. Semesters are optional
+# properties because repair answers only contain the semesters that were asked for.
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {f"Semester {i}": SEMESTER_SCHEMA for i in range(1, MAX_PLAN_SEMESTERS + 1)},
+    "additionalProperties": False,
+}
+
+class OffSchemaError(ValueError):
+    """Raised when streamed model output can no longer become a valid plan."""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+def _is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def check_semester(name, semester):
+    """
+    Checks one completed semester against SEMESTER_SCHEMA and the budgets.
+    :raises OffSchemaError: With the first problem found.
+    """
+    if not SEMESTER_NAME.fullmatch(str(name)):
+        raise OffSchemaError(f"Unexpected key {name!r} in plan", "key")
+    if not isinstance(semester, dict) or set(semester) != {"Total Credits", "Courses"}:
+        raise OffSchemaError(f"{name} must have exactly Total Credits and Courses", "shape")
+    if not _is_integer(semester["Total Credits"]):
+        raise OffSchemaError(f"{name} Total Credits must be an integer", "shape")
+    courses = semester["Courses"]
+    if not isinstance(courses, list):
+        raise OffSchemaError(f"{name} Courses must be a list", "shape")
+    if len(courses) > MAX_COURSES_PER_SEMESTER:
+        raise OffSchemaError(f"{name} has {len(courses)} courses (max {MAX_COURSES_PER_SEMESTER})", "budget")
+    for course in courses:
+        if not isinstance(course, dict) or set(course) != {"Course Name", "Course Code", "Credits"}:
+            raise OffSchemaError(f"{name} has a course without exactly Course Name, Course Code and Credits", "shape")
+        if not isinstance(course["Course Name"], str) or not isinstance(course["Course Code"], str):
+            raise OffSchemaError(f"{name} has a course whose name or code is not a string", "shape")
+        if not _is_integer(course["Credits"]) or not 0 < course["Credits"] <= MAX_COURSE_CREDITS:
+            raise OffSchemaError(f"{name} has a course with invalid credits {course['Credits']!r}", "shape")
+
+class PlanGuard:
+    """
+    Validates a streamed plan while it is generated. Wraps PlanStreamParser, checks each
+    semester as soon as it closes and watches the text budgets, so that a generation that
+    goes off-schema can be aborted after a few hundred characters instead of at the end.
+    """
+
+    def __init__(self, max_semesters=MAX_PLAN_SEMESTERS):
+        self.max_semesters = max_semesters
+        self.parser = PlanStreamParser()
+        self._preamble = 0
+        self._since_semester = 0
+
+    @property
+    def plan(self):
+        return self.parser.plan
+
+    @property
+    def done(self):
+        return self.parser.done
+
+    def feed(self, text):
+        """
+        :return: List of (semester name, semester dictionary) pairs completed by this piece.
+        :raises OffSchemaError: As soon as the output cannot become a valid plan.
+        """
+        if self.parser.depth == 0 and not self.parser.done:
+            before_plan = text.split("{", 1)[0]
+            self._preamble += len(before_plan)
+            if self._preamble > MAX_PREAMBLE_CHARS:
+                raise OffSchemaError("Model answered with prose instead of a plan", "prose")
+        self._since_semester += len(text)
+
+        try:
+            completed = self.parser.feed(text)
+        except ValueError as e:
+            raise OffSchemaError(f"Malformed JSON in plan: {e}", "syntax")
+        for name, semester in completed:
+            check_semester(name, semester)
+        if len(self.parser.plan) > self.max_semesters:
+            raise OffSchemaError(f"Plan has more than {self.max_semesters} semesters", "budget")
+        if completed:
+            self._since_semester = 0
+        elif self._since_semester > MAX_SEMESTER_CHARS:
+            raise OffSchemaError(f"No semester completed within {MAX_SEMESTER_CHARS} characters", "runaway")
+        return completed
+
+    def finish(self):
+        """
+        Call when the stream ends.
+        :return: The plan.
+        :raises OffSchemaError: If the plan was cut off or is empty.
+        """
+        if not self.parser.done:
+            raise OffSchemaError("Plan was cut off before its closing brace", "truncated")
+        if not self.parser.plan:
+            raise OffSchemaError("Model returned an empty plan", "shape")
+        return self.parser.plan
@@ -0,0 +1,209 @@
+import math
+import re
+
+from modules.degree_rules import (
+    DISSERTATION_CODE,
+    DISSERTATION_MAX,
+    DISSERTATION_PER_SEMESTER,
+    FALL_SEMINAR_CODE,
+    FULL_TIME_CREDITS,
+    MAX_SPECIAL_CREDITS,
+    MAX_SPECIAL_PROBLEM_CREDITS,
+    MIN_LEVEL,
+    MIN_SEMINAR_CREDITS,
+    SEMINAR_CODES,
+    SEMINAR_CREDITS,
+    SPECIAL_PROBLEM_CODES,
+    SPECIAL_TOPIC_CODES,
+    THESIS_CODE,
+    course_level,
+    credit_targets,
+    course_prefix,
+    normalize_code,
+    parse_credits,
+)
+
+DEFAULT_COURSE_CREDITS = 3
+THESIS_CHUNK_CREDITS = 3
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {"and", "the", "for", "with", "in", "of", "to", "a", "an", "on"}
+
+DEFAULT_NAMES = {
+    DISSERTATION_CODE: "Doctoral Dissertation Research",
+    THESIS_CODE: "Masters Thesis Research",
+    "ELE 601": "Graduate Seminar in Electrical Engineering",
+    "ELE 602": "Graduate Seminar in Electrical Engineering",
+}
+
+class PlanInfeasibleError(ValueError):
+    """Raised when the department catalog cannot satisfy the degree rules."""
+
+def _keywords(text):
+    return {word for word in WORD_PATTERN.findall(str(text or "").lower()) if len(word) > 2 and word not in STOP_WORDS}
+
+def _entry(name, code, credits):
+    return {"Course Name": name, "Course Code": code, "Credits": credits}
+
+def _pick_courses(candidates, needed, special_problem_credits, special_credits):
+    """
+    Greedily picks candidates (already ranked) until `needed` credits are covered,
+    respecting the special problems/topics caps. Courses that would overshoot the
+    requirement are only considered once nothing else fits.
+    """
+    picked = []
+    picked_codes = set()
+    total = 0
+    for allow_overshoot in (False, True):
+        for candidate in candidates:
+            code, credits = candidate["code"], candidate["credits"]
+            if total >= needed:
+                break
+            if code in picked_codes or (not allow_overshoot and total + credits > needed):
+                continue
+            is_problem = code in SPECIAL_PROBLEM_CODES
+            is_special = is_problem or code in SPECIAL_TOPIC_CODES
+            if is_problem and special_problem_credits + credits > MAX_SPECIAL_PROBLEM_CREDITS:
+                continue
+            if is_special and special_credits + credits > MAX_SPECIAL_CREDITS:
+                continue
+            special_problem_credits += credits if is_problem else 0
+            special_credits += credits if is_special else 0
+            picked.append(candidate)
+            picked_codes.add(code)
+            total += credits
+    return picked, total, special_problem_credits, special_credits
+
+def solve_plan(data, catalog_courses, first_term="Fall"):
+    """
+    Builds a semester plan that satisfies the degree rules without calling the model.
+    Coursework is chosen from the department catalog, ranked by how many words of the
+    student's program of study appear in the course name, then by level. Dissertation
+    credits fill every semester up to a full-time load, and ELE 601 is added every Fall.
+    :param data: Payload sent by the client to /generate_subjects.
+    :param catalog_courses: Output of get_courses_by_department() for the student's department.
+    :param first_term: Term of the first planned semester ("Fall" or "Spring").
+    :return: Plan dictionary in the same shape the model is asked to produce.
+    :raises PlanInfeasibleError: If the catalog does not offer enough eligible coursework.
+    """
+    masters_completed = bool(data.get("Masters Completed", False))
+    completed_courses = data.get("Completed Courses") or []
+
+    completed_codes = set()
+    completed_dissertation = completed_seminar = 0
+    special_problem_credits = special_credits = 0
+    for course in completed_courses:
+        code = normalize_code(course.get("Course Code"))
+        credits = parse_credits(course.get("Credits"), 0)
+        completed_codes.add(code)
+        if code == DISSERTATION_CODE:
+            completed_dissertation += credits
+        elif code in SEMINAR_CODES:
+            completed_seminar += credits
+        if code in SPECIAL_PROBLEM_CODES:
+            special_problem_credits += credits
+        if code in SPECIAL_PROBLEM_CODES or code in SPECIAL_TOPIC_CODES:
+            special_credits += credits
+
+    targets = credit_targets(completed_courses, masters_completed)
+    ms_coursework = targets["ms_coursework"]
+    thesis = targets["thesis"]
+    dissertation = targets["dissertation"]
+    post_coursework = targets["post_ms_coursework"]
+
+    names = {}
+    keywords = _keywords(data.get("Program of Study"))
+    candidates = []
+    for course in catalog_courses:
+        code = normalize_code(course.get("Course Code"))
+        if code in names:
+            continue
+        names[code] = course.get("Course Name")
+        level = course_level(code)
+        if (level is None or level < MIN_LEVEL or code in completed_codes
+                or code in SEMINAR_CODES or code in (DISSERTATION_CODE, THESIS_CODE)):
+            continue
+        credits = parse_credits(course.get("Credits"), DEFAULT_COURSE_CREDITS)
+        if credits <= 0:
+            continue
+        relevance = len(keywords & _keywords(course.get("Course Name")))
+        candidates.append({
+            "name": course.get("Course Name"),
+            "code": code,
+            "credits": credits,
+            "rank": (-relevance, course_prefix(code) != "ELE", level, code),
+        })
+    candidates.sort(key=lambda candidate: candidate["rank"])
+
+    ms_picked, ms_total, special_problem_credits, special_credits = _pick_courses(
+        candidates, ms_coursework, special_problem_credits, special_credits
+    )
+    ms_codes = {candidate["code"] for candidate in ms_picked}
+    remaining = [candidate for candidate in candidates if candidate["code"] not in ms_codes]
+    post_picked, post_total, _, _ = _pick_courses(
+        remaining, post_coursework, special_problem_credits, special_credits
+    )
+
+    # Not enough coursework: lean on the dissertation allowance before giving up
+    shortfall = (ms_coursework - ms_total) + (post_coursework - post_total)
+    if shortfall > 0:
+        extra_dissertation = min(shortfall, max(0, DISSERTATION_MAX - completed_dissertation - dissertation))
+        dissertation += extra_dissertation
+        if ms_coursework > ms_total or shortfall > extra_dissertation:
+            raise PlanInfeasibleError("Not enough eligible courses in the department catalog to build a plan")
+
+    # Lay out coursework, keeping at least one credit free for ELE 699 every semester
+    units = [_entry(c["name"], c["code"], c["credits"]) for c in ms_picked]
+    while thesis > 0:
+        chunk = min(THESIS_CHUNK_CREDITS, thesis)
+        units.append(_entry(names.get(THESIS_CODE) or DEFAULT_NAMES[THESIS_CODE], THESIS_CODE, chunk))
+        thesis -= chunk
+    units += [_entry(c["name"], c["code"], c["credits"]) for c in post_picked]
+
+    capacity = FULL_TIME_CREDITS - 1
+    semesters = [[]]
+    for unit in units:
+        if semesters[-1] and sum(c["Credits"] for c in semesters[-1]) + unit["Credits"] > capacity:
+            semesters.append([])
+        semesters[-1].append(unit)
+    while len(semesters) < math.ceil(dissertation / DISSERTATION_PER_SEMESTER):
+        semesters.append([])
+
+    # Spread ELE 699 so every semester has some and none exceeds the per-semester cap
+    loads = [sum(c["Credits"] for c in semester) for semester in semesters]
+    dissertation_credits = [min(DISSERTATION_PER_SEMESTER, max(1, FULL_TIME_CREDITS - load)) for load in loads]
+    # Trim from the earliest semesters and top up the latest ones, one credit at a time
+    while sum(dissertation_credits) > dissertation and max(dissertation_credits) > 1:
+        i = next(i for i, credits in enumerate(dissertation_credits) if credits == max(dissertation_credits))
+        dissertation_credits[i] -= 1
+    while sum(dissertation_credits) < dissertation and min(dissertation_credits) < DISSERTATION_PER_SEMESTER:
+        i = max(i for i, credits in enumerate(dissertation_credits) if credits == min(dissertation_credits))
+        dissertation_credits[i] += 1
+    while sum(dissertation_credits) < dissertation:
+        semesters.append([])
+        dissertation_credits.append(min(DISSERTATION_PER_SEMESTER, dissertation - sum(dissertation_credits)))
+
+    dissertation_name = names.get(DISSERTATION_CODE) or DEFAULT_NAMES[DISSERTATION_CODE]
+    for semester, credits in zip(semesters, dissertation_credits):
+        semester.append(_entry(dissertation_name, DISSERTATION_CODE, credits))
+
+    # ELE 601 every Fall; ELE 602 in Spring if that is not enough seminar credits
+    terms = ["Fall", "Spring"] if first_term == "Fall" else ["Spring", "Fall"]
+    seminar_credits = completed_seminar
+    for i, semester in enumerate(semesters):
+        if terms[i % 2] == "Fall":
+            semester.insert(0, _entry(names.get(FALL_SEMINAR_CODE) or DEFAULT_NAMES[FALL_SEMINAR_CODE], FALL_SEMINAR_CODE, SEMINAR_CREDITS))
+            seminar_credits += SEMINAR_CREDITS
+    for i, semester in enumerate(semesters):
+        if seminar_credits >= MIN_SEMINAR_CREDITS:
+            break
+        if terms[i % 2] == "Spring":
+            semester.insert(0, _entry(names.get("ELE 602") or DEFAULT_NAMES["ELE 602"], "ELE 602", SEMINAR_CREDITS))
+            seminar_credits += SEMINAR_CREDITS
+
+    return {
+        f"Semester {i + 1}": {
+            "Total Credits": sum(c["Credits"] for c in semester),
+            "Courses": semester,
+        }
+        for i, semester in enumerate(semesters)
+    }
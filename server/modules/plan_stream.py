@@ -0,0 +1,85 @@
+import json
+import re
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+def loads_lenient(text):
+    """
+    json.loads that also accepts trailing commas, which the model sometimes copies from the prompt template.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(TRAILING_COMMA.sub(r"\1", text))
+
+class PlanStreamParser:
+    """
+    Incremental parser for a streamed plan of the form {"Semester 1": {...}, "Semester 2": {...}}.
+    Text before the opening brace is skipped. Each top-level object value is returned by
+    feed() as soon as its closing brace arrives, so semesters can be shown while the
+    model is still generating the rest of the plan.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+        self.key = None
+        self.plan = {}
+        self._string = []
+        self._value = []
+        self._last_string = None
+
+    def feed(self, text):
+        """
+        Consumes the next piece of model output.
+        :return: List of (semester name, semester dictionary) pairs completed by this piece.
+        """
+        completed = []
+        for char in text:
+            if self.done:
+                break
+            if self.depth == 0:
+                # Skip any prose before the plan
+                if char == "{":
+                    self.depth = 1
+                continue
+            if self.depth >= 2:
+                self._value.append(char)
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                    if self.depth == 1:
+                        self._string.append(char)
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self._last_string = "".join(self._string)
+                elif self.depth == 1:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self._string = []
+            elif char in "{[":
+                if self.depth == 1:
+                    self.key = self._last_string
+                    self._value = [char]
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 1 and char == "}":
+                    value = loads_lenient("".join(self._value))
+                    self.plan[self.key] = value
+                    completed.append((self.key, value))
+                    self._value = []
+                elif self.depth == 0:
+                    self.done = True
+            elif char == ":" and self.depth == 1:
+                self.key = self._last_string
+        return completed
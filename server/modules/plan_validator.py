@@ -0,0 +1,189 @@
+import json
+
+from modules.degree_rules import (
+    DISSERTATION_CODE,
+    DISSERTATION_MAX,
+    DISSERTATION_MIN,
+    DISSERTATION_PER_SEMESTER,
+    FALL_SEMINAR_CODE,
+    MAX_SPECIAL_CREDITS,
+    MAX_SPECIAL_PROBLEM_CREDITS,
+    MIN_LEVEL,
+    MIN_SEMINAR_CREDITS,
+    SEMINAR_CODES,
+    SPECIAL_PROBLEM_CODES,
+    SPECIAL_TOPIC_CODES,
+    THESIS_CODE,
+    course_level,
+    credit_targets,
+    normalize_code,
+    parse_credits,
+)
+
+REPEATABLE_CODES = set(SEMINAR_CODES) | {DISSERTATION_CODE, THESIS_CODE}
+
+def _violation(rule, message, semesters=()):
+    return {"rule": rule, "message": message, "Semesters": list(semesters)}
+
+def _semester_courses(details):
+    """
+    :return: List of (normalized code, credits, course) for a semester, or None if malformed.
+    """
+    if not isinstance(details, dict) or not isinstance(details.get("Courses"), list):
+        return None
+    courses = []
+    for course in details["Courses"]:
+        if not isinstance(course, dict):
+            return None
+        courses.append((normalize_code(course.get("Course Code")), parse_credits(course.get("Credits")), course))
+    return courses
+
+def validate_plan(plan, data, first_term="Fall"):
+    """
+    Checks a plan against the degree rules.
+    Violations that can be pinned to particular semesters list them in "Semesters", so only
+    those semesters need to be regenerated; plan-wide violations list the semesters involved,
+    or none when no single semester is at fault.
+    :param plan: Plan dictionary ({"Semester 1": {"Total Credits": ..., "Courses": [...]}, ...}).
+    :param data: Payload sent by the client to /generate_subjects.
+    :param first_term: Term of "Semester 1"; terms alternate from there.
+    :return: List of violation dictionaries with "rule", "message" and "Semesters" keys.
+    """
+    if not isinstance(plan, dict) or not plan:
+        return [_violation("structure", "Plan must be a non-empty object of semesters")]
+
+    masters_completed = bool(data.get("Masters Completed", False))
+    completed = [
+        (normalize_code(course.get("Course Code")), parse_credits(course.get("Credits"), 0))
+        for course in data.get("Completed Courses") or []
+    ]
+    completed_codes = {code for code, _ in completed}
+
+    violations = []
+    planned_credits = 0
+    planned_seminar_credits = 0
+    seminar_credits = sum(credits for code, credits in completed if code in SEMINAR_CODES)
+    completed_dissertation = sum(credits for code, credits in completed if code == DISSERTATION_CODE)
+    dissertation_credits = completed_dissertation
+    special_problem_credits = sum(credits for code, credits in completed if code in SPECIAL_PROBLEM_CODES)
+    special_credits = sum(
+        credits for code, credits in completed if code in SPECIAL_PROBLEM_CODES or code in SPECIAL_TOPIC_CODES
+    )
+    special_semesters = []
+    seen_codes = {}
+    planned_codes = set()
+    terms = ["Fall", "Spring"] if first_term == "Fall" else ["Spring", "Fall"]
+
+    for index, (semester, details) in enumerate(plan.items()):
+        courses = _semester_courses(details)
+        if courses is None:
+            violations.append(_violation("structure", f"{semester} must have a list of course objects", [semester]))
+            continue
+
+        semester_credits = 0
+        semester_dissertation = 0
+        for code, credits, course in courses:
+            if credits is None:
+                violations.append(_violation("structure", f"{semester}: {code or 'a course'} has no credit count", [semester]))
+                continue
+            semester_credits += credits
+            planned_codes.add(code)
+            level = course_level(code)
+            if level is None or level < MIN_LEVEL:
+                violations.append(_violation("level", f"{semester}: {code or course.get('Course Name')} is below the {MIN_LEVEL} level", [semester]))
+            if code not in REPEATABLE_CODES:
+                if code in completed_codes:
+                    violations.append(_violation("duplicate", f"{semester}: {code} was already completed", [semester]))
+                elif code in seen_codes:
+                    violations.append(_violation("duplicate", f"{semester}: {code} is already planned in {seen_codes[code]}", [semester]))
+                seen_codes.setdefault(code, semester)
+            if code in SEMINAR_CODES:
+                seminar_credits += credits
+                planned_seminar_credits += credits
+            if code == DISSERTATION_CODE:
+                semester_dissertation += credits
+            if code in SPECIAL_PROBLEM_CODES:
+                special_problem_credits += credits
+            if code in SPECIAL_PROBLEM_CODES or code in SPECIAL_TOPIC_CODES:
+                special_credits += credits
+                special_semesters.append(semester)
+
+        planned_credits += semester_credits
+        dissertation_credits += semester_dissertation
+
+        total = parse_credits(details.get("Total Credits"))
+        if total != semester_credits:
+            violations.append(_violation("total", f"{semester}: Total Credits is {total} but the courses add up to {semester_credits}", [semester]))
+        if semester_dissertation == 0:
+            violations.append(_violation("dissertation", f"{semester} has no {DISSERTATION_CODE} credits", [semester]))
+        elif semester_dissertation > DISSERTATION_PER_SEMESTER:
+            violations.append(_violation("dissertation", f"{semester} has {semester_dissertation} {DISSERTATION_CODE} credits (max {DISSERTATION_PER_SEMESTER})", [semester]))
+        if terms[index % 2] == "Fall" and FALL_SEMINAR_CODE not in {code for code, _, _ in courses}:
+            violations.append(_violation("seminar", f"{semester} is a Fall semester without {FALL_SEMINAR_CODE}", [semester]))
+
+    # ELE 699 is required every semester, so credits beyond DISSERTATION_MAX are allowed but earn no program credit
+    if dissertation_credits < DISSERTATION_MIN:
+        violations.append(_violation("dissertation", f"Plan has {dissertation_credits} {DISSERTATION_CODE} credits (needs at least {DISSERTATION_MIN})"))
+    planned_dissertation = dissertation_credits - completed_dissertation
+    unpaid_dissertation = max(0, planned_dissertation - max(0, DISSERTATION_MAX - completed_dissertation))
+    if seminar_credits < MIN_SEMINAR_CREDITS:
+        violations.append(_violation("seminar", f"Plan has {seminar_credits} seminar credits (needs {MIN_SEMINAR_CREDITS})"))
+    if special_problem_credits > MAX_SPECIAL_PROBLEM_CREDITS:
+        violations.append(_violation("special", f"{special_problem_credits} credits of special problems (max {MAX_SPECIAL_PROBLEM_CREDITS})", sorted(set(special_semesters))))
+    if special_credits > MAX_SPECIAL_CREDITS:
+        violations.append(_violation("special", f"{special_credits} credits of special problems/topics (max {MAX_SPECIAL_CREDITS})", sorted(set(special_semesters))))
+
+    targets = credit_targets(data.get("Completed Courses") or [], masters_completed)
+    required = sum(targets.values())
+    program_credits = planned_credits - planned_seminar_credits - unpaid_dissertation
+    if program_credits < required:
+        violations.append(_violation("total", f"Plan has {program_credits} program credits besides seminars; {required} are required"))
+    if targets["thesis"] and THESIS_CODE not in planned_codes:
+        violations.append(_violation("thesis", f"Students without an M.S. need {THESIS_CODE} thesis credits"))
+
+    return violations
+
+def semesters_to_repair(plan, violations):
+    """
+    :return: Names of the semesters that appear in any violation, in plan order.
+    """
+    flagged = {semester for violation in violations for semester in violation["Semesters"]}
+    return [semester for semester in plan if semester in flagged]
+
+def has_plan_wide_violations(violations):
+    """
+    :return: Whether any violation is not pinned to a semester, such as a credit shortfall or a
+    missing thesis; fixing those takes adding or replacing semesters.
+    """
+    return any(not violation["Semesters"] for violation in violations)
+
+def repair_prompt(plan, violations, semesters=None):
+    """
+    Builds the follow-up message that asks the model to regenerate only the given semesters,
+    or, without semesters, only the semesters to add or replace to fix plan-wide violations.
+    """
+    if semesters is None:
+        problems = "\n".join(f"- {violation['message']}" for violation in violations)
+        return f"""
+    The plan below breaks these rules:
+    {problems}
+
+    Current plan:
+    {json.dumps(plan, indent=2)}
+
+    Return corrected JSON containing only the semesters you add or replace, named "Semester N"
+    like the others (new semesters continue the numbering). Use the same format, leave out the
+    semesters that stay unchanged and don't add any comments.
+    """
+
+    problems = "\n".join(f"- {violation['message']}" for violation in violations if set(violation["Semesters"]) & set(semesters))
+    return f"""
+    The plan below breaks these rules:
+    {problems}
+
+    Current plan:
+    {json.dumps(plan, indent=2)}
+
+    Return corrected JSON containing only these semesters: {", ".join(semesters)}.
+    Use the same format, keep the other semesters unchanged and don't add any comments.
+    """
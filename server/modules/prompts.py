@@ -0,0 +1,122 @@
+import json
+
+from modules.course_search import credit_range
+from modules.degree_rules import DISSERTATION_CODE, THESIS_CODE, credit_targets, parse_credits
+
+# The static prefix (system prompt, degree rules and output format) is identical for every
+# student so the model server can reuse its KV cache; only the student details need prefill.
+SYSTEM_PROMPT = "You are a helpful academic advisor."
+
+INITIAL_RULES = """
+        Rules:
+        - Minimum of 72 credits in engineering, mathematics, and/or science courses.
+        - The M. S. degree may count for up to 30 of the 72 credits required for the Ph. D.
+        - Minimum of 18 credits, beyond the first 30 credits, in formal graduate engineering, 
+        mathematics, and/or science courses. 
+        - Up to three credits of special problems (ELE 591 and/or ELE 691), sometimes called 
+        “independent study,” may be counted toward this requirement. 
+        - Maximum of nine credits of special problems (ELE 591 and/or ELE 691) and special topics 
+        (ELE 594 and/or ELE 694) may be counted toward this requirement. Department seminar (ELE 601 and ELE 602) may not be counted
+        toward this requirement.
+        - At least 18, but no more than 24, credits of dissertation (ELE 699). Additional ELE 699 credits may be completed for no program credit.
+        - All full-time graduate students (M. S. or Ph. D.) are required to enroll in ELE 601 every semester the course offered. (It is offered only on Fall Semesters)
+        - Minimum of two credits of departmental seminar (ELE 601 and ELE 602). These credits may not be counted toward the 42 credits required beyond the first 30 credits (or the M. S. degree).
+
+        If a student has not completed M.S. there are more rules for the initial 30 credits: 
+        - Complete a minimum of 30 credits, which include engineering mathematics and/or science courses. 
+        - At least 16 credits must be from formal graduate electrical engineering (ELE) courses, excluding ELE 601 and ELE 602 (departmental seminars).
+        - The Course Restrictions are: 
+            - A maximum of 12 credits can be taken from senior undergraduate (400-level) courses in engineering, mathematics and/or science.
+            - Up to three credits can be from special problems or independent study courses (ELE 591/592/691/692).
+            - All full-time graduate students are required to enroll in the departmental seminar ELE 601 every semester it is offered.
+        - Can pick 6-9 credits of thesis research (ELE 599), where six credits are standard. More than six credits require approval from your thesis committee and the Graduate Director/Department Chair.
+        
+        For students that have not yet completed their M.S. degree, the courses they pick should comprise of both the M.S. and Ph.D. requirements. 
+        For students that have completed M.S. degree, only 42 credits need to be planned. 
+        Only 8 credits of Doctoral Dissertation can be taken per semester. 
+        Only courses of 500 level or higher can be taken.
+        Each seminar is 1 credit. 
+        Students must have Doctoral Dissertation credits in their plan every semester even during their masters requirements.  
+        """
+
+PLAN_REQUEST = """
+        Based on the provided details, generate a structured academic plan in JSON format:
+        {{
+            "Semester 1": {{
+                "Total Credits": integer,
+                "Courses": [
+                    {{
+                        "Course Name": string,
+                        "Course Code": string,
+                        "Credits": integer
+                    }}
+                ]
+            }},
+            "Semester 2": {{
+                "Total Credits": integer,
+                "Courses": [
+                    {{
+                        "Course Name": string,
+                        "Course Code": string,
+                        "Credits": integer
+                    }}
+                ]
+            }},
+        }}
+        - Don't add any comments. Just provide the full 72 credit plan for all semesters. 
+        """
+
+STATIC_PREFIX = f"{SYSTEM_PROMPT}\n{INITIAL_RULES}\n{PLAN_REQUEST}"
+
+def static_prefix_messages():
+    """
+    Returns the messages every plan prompt starts with. Their content must not vary
+    between requests, otherwise the cached prefix is lost.
+    """
+    return [{"role": "system", "content": STATIC_PREFIX}]
+
+def catalog_line(course):
+    """
+    One course of the catalog section, e.g. "ELE 520 | Signal Processing | 3 credits | Fall".
+    """
+    low, high = credit_range(course.get("Credits"))
+    credits = "?" if low is None else f"{low:g}" if low == high else f"{low:g}-{high:g}"
+    semester = course.get("Semester")
+    if not isinstance(semester, str):
+        semester = json.dumps(semester)
+    return f"{course.get('Course Code')} | {course.get('Course Name')} | {credits} credits | {semester}"
+
+def catalog_section(courses):
+    """
+    Lists the catalog courses the model may choose from.
+    """
+    lines = "\n".join(f"    - {catalog_line(course)}" for course in courses)
+    return f"""
+    - Available Courses (choose only from these):
+{lines}
+    """
+
+def student_details(data, courses=None):
+    """
+    Builds the student-specific suffix of the plan prompt.
+    :param data: Payload sent by the client to /generate_subjects.
+    :param courses: Catalog courses relevant to the student, or None to leave the catalog out.
+    """
+    department = data.get("Department")
+    program_of_study = data.get("Program of Study")
+    masters_completed = data.get("Masters Completed", False)
+    completed_courses = data.get("Completed Courses") or []
+    completed_credits = sum(parse_credits(course.get("Credits"), 0) for course in completed_courses)
+    # Counted the way the validator checks the plan: dissertation and seminar credits are not M.S. credits
+    targets = credit_targets(completed_courses, masters_completed)
+
+    return f""" This is the detail of the student: 
+    - Program of Study: {program_of_study}
+    - Department: {department}
+    - Total Credits Completed: {completed_credits}
+    - Master's Degree Completed: {"Yes" if masters_completed else "No"}
+    - Credits Remaining for MS: {targets["ms_coursework"] + targets["thesis"]} (including {targets["thesis"]} {THESIS_CODE} thesis credits)
+    - Minimum {DISSERTATION_CODE} Credits Remaining: {targets["dissertation"]}
+    - Coursework Credits Remaining beyond the MS: {targets["post_ms_coursework"]}
+    - Completed Courses: {json.dumps(completed_courses, indent=2)}
+    """ + (catalog_section(courses) if courses else "")
@@ -0,0 +1,216 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+CHARS_PER_TOKEN = 4
+MAX_SESSION_ID_LENGTH = 64
+
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_used ON sessions (last_used);
+"""
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (about four characters per token for English text).
+    """
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+class Conversation:
+    """
+    Message history of one session, kept under a token budget.
+    Pinned messages (system prompt, rules) are always sent first and never dropped.
+    History is stored as turns (the messages of one request). When the budget is
+    exceeded the oldest turns are dropped ("truncate") or folded into one short
+    note ("summarize"); the newest turn is always kept.
+    """
+
+    def __init__(self, pinned_messages, token_budget=4096, policy="truncate", summary_tokens=256):
+        self.pinned = list(pinned_messages)
+        self.turns = []
+        self.summary = None
+        self.token_budget = token_budget
+        self.policy = policy
+        self.summary_tokens = summary_tokens
+        self.lock = threading.Lock()
+
+    def add_turn(self, messages, replace=False):
+        """
+        Appends the messages of one request and trims the history to the token budget.
+        :param replace: Drop the earlier turns (and their summary) first, for requests that stand on their own.
+        """
+        if replace:
+            self.turns = []
+            self.summary = None
+        self.turns.append(list(messages))
+        while len(self.turns) > 1 and self.token_count() > self.token_budget:
+            dropped = self.turns.pop(0)
+            if self.policy == "summarize":
+                self._summarize(dropped)
+
+    def _summarize(self, dropped):
+        # Keep the opening line of every dropped message, oldest lines go first
+        lines = [] if self.summary is None else self.summary["content"].splitlines()[1:]
+        for message in dropped:
+            content = message["content"].strip()
+            first_line = content.splitlines()[0] if content else ""
+            lines.append(f"- {message['role']}: {first_line[:160]}")
+        while lines and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        self.summary = {"role": "system", "content": "Earlier in this conversation:\n" + "\n".join(lines)}
+
+    def token_count(self):
+        return sum(estimate_tokens(message["content"]) for message in self.prompt_messages())
+
+    def prompt_messages(self):
+        """
+        :return: The messages to send to the model, in order.
+        """
+        summary = [self.summary] if self.summary is not None else []
+        return self.pinned + summary + [message for turn in self.turns for message in turn]
+
+    def state(self):
+        """
+        :return: JSON text of the history; the pinned messages are not included.
+        """
+        return json.dumps({"turns": self.turns, "summary": self.summary})
+
+    def load_state(self, state):
+        history = json.loads(state)
+        self.turns = history["turns"]
+        self.summary = history["summary"]
+
+class SessionStore:
+    """
+    Store of conversations keyed by session ID.
+    Sessions idle for longer than the TTL are evicted, as is the least recently used
+    session once max_sessions is reached. With a database path, sessions are kept in
+    SQLite instead of process memory, so every server worker sees the same sessions.
+    """
+
+    def __init__(self, conversation_factory, max_sessions=1000, ttl_seconds=30 * 60, path=None):
+        """
+        :param path: SQLite database shared by the server workers, or None to keep sessions in this process.
+        """
+        self.conversation_factory = conversation_factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if path:
+            self._connect().executescript(SESSION_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id=None):
+        """
+        Returns the conversation for a session, creating a new session if the ID is
+        missing, unknown or expired.
+        :return: Tuple of (session_id, Conversation). With a database, the Conversation is a
+        copy; change it through add_turn().
+        """
+        if session_id and len(session_id) > MAX_SESSION_ID_LENGTH:
+            session_id = None
+        if self.path:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                session_id, conversation = self._load(conn, session_id)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return session_id, conversation
+
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id) if session_id else None
+            if entry is None:
+                session_id = session_id or uuid.uuid4().hex
+                entry = [self.conversation_factory(), now]
+                self._sessions[session_id] = entry
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            return session_id, entry[0]
+
+    def add_turn(self, session_id, messages, replace=False):
+        """
+        Appends the messages of one request to a session, creating the session if needed.
+        :param replace: Drop the session's earlier turns first (see Conversation.add_turn()).
+        :return: Tuple of (session_id, the messages to send to the model).
+        """
+        if not self.path:
+            session_id, conversation = self.get(session_id)
+            with conversation.lock:
+                conversation.add_turn(messages, replace)
+                return session_id, conversation.prompt_messages()
+
+        if session_id and len(session_id) > MAX_SESSION_ID_LENGTH:
+            session_id = None
+        conn = self._connect()
+        # The write lock is held from read to write, so concurrent turns of one session are not lost
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            session_id, conversation = self._load(conn, session_id)
+            conversation.add_turn(messages, replace)
+            conn.execute("UPDATE sessions SET state = ? WHERE id = ?", (conversation.state(), session_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return session_id, conversation.prompt_messages()
+
+    def _load(self, conn, session_id):
+        """
+        Reads or creates a session inside the caller's transaction and marks it as used.
+        """
+        now = time.time()
+        conn.execute("DELETE FROM sessions WHERE last_used < ?", (now - self.ttl_seconds,))
+        conversation = self.conversation_factory()
+        row = conn.execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone() if session_id else None
+        if row is not None:
+            conversation.load_state(row[0])
+            conn.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+            return session_id, conversation
+
+        session_id = session_id or uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO sessions (id, state, last_used) VALUES (?, ?, ?)",
+            (session_id, conversation.state(), now),
+        )
+        conn.execute(
+            "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+        return session_id, conversation
+
+    def _evict_expired(self, now):
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self):
+        if self.path:
+            return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return len(self._sessions)
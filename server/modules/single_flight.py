@@ -0,0 +1,82 @@
+import threading
+
+class Call:
+    """
+    One in-flight computation that several callers may be waiting on.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the leader finishes and returns its result, or raises its exception.
+        """
+        if not self.event.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests: the first caller for a key (the leader)
+    runs the computation and everyone who asks for the same key meanwhile shares its
+    result instead of hitting the upstream again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "shared": 0}
+
+    def begin(self, key):
+        """
+        Registers interest in a key.
+        :return: Tuple of (Call, is_leader). The leader must finish the call with
+        finish(); everyone else waits on it with Call.wait().
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["shared"] += 1
+                return call, False
+            call = Call()
+            self._calls[key] = call
+            self.stats["leaders"] += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """
+        Publishes the leader's result (or exception) and releases the waiters.
+        """
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call.event.set()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) unless an identical call is already in flight, in which case
+        its result is shared.
+        """
+        call, is_leader = self.begin(key)
+        if not is_leader:
+            return call.wait()
+        result = None
+        error = RuntimeError("In-flight call was interrupted")
+        try:
+            result = fn(*args, **kwargs)
+            error = None
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.finish(key, call, result=result, error=error)
+        return result
@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+class QueueFullError(RuntimeError):
+    """Raised when the work queue cannot take another request; carries a retry hint in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class WorkQueue:
+    """
+    Bounded, prioritized admission queue in front of a scarce upstream (the model).
+    At most `concurrency` jobs run at once; up to `max_waiting` more wait in priority
+    order (lower value first, FIFO within a priority). When the waiting list is full,
+    a request displaces the newest waiter of a lower priority, so batch work cannot lock
+    interactive users out; otherwise it is rejected immediately with a retry hint
+    instead of piling up.
+    """
+
+    def __init__(self, concurrency=2, max_waiting=32, wait_timeout=120):
+        """
+        :param concurrency: Jobs allowed to run at the same time.
+        :param max_waiting: Jobs allowed to wait for a slot.
+        :param wait_timeout: Seconds a job may wait before it is rejected.
+        """
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._condition = threading.Condition()
+        self._waiting = []
+        # Tickets displaced from the waiting list; their waiters raise QueueFullError
+        self._evicted = set()
+        self._sequence = itertools.count()
+        self._active = 0
+        self._wait_times = deque(maxlen=1000)
+        self._service_times = deque(maxlen=100)
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0, "evicted": 0}
+
+    def retry_after(self):
+        """
+        Estimates how many seconds it will take for the current backlog to drain.
+        """
+        service_time = sum(self._service_times) / len(self._service_times) if self._service_times else 30.0
+        backlog = len(self._waiting) + self._active
+        return max(1, math.ceil(backlog * service_time / self.concurrency))
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE):
+        """
+        Waits for a slot.
+        :return: Admission time, to be passed to release().
+        :raises QueueFullError: If the queue is full, the wait times out or a request of
+        higher priority takes the place.
+        """
+        enqueued = time.monotonic()
+        with self._condition:
+            if len(self._waiting) >= self.max_waiting:
+                lowest = max(self._waiting)
+                if lowest[0] <= priority:
+                    self.stats["rejected"] += 1
+                    raise QueueFullError("Server is busy generating plans, please retry later", self.retry_after())
+                self._waiting.remove(lowest)
+                heapq.heapify(self._waiting)
+                self._evicted.add(lowest)
+                self.stats["evicted"] += 1
+                self._condition.notify_all()
+
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            deadline = enqueued + self.wait_timeout
+            while True:
+                if ticket in self._evicted:
+                    self._evicted.discard(ticket)
+                    raise QueueFullError("Displaced by a higher-priority request, please retry later", self.retry_after())
+                if self._active < self.concurrency and self._waiting[0] == ticket:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self.stats["timed_out"] += 1
+                    self._condition.notify_all()
+                    raise QueueFullError("Timed out waiting for a free model slot", self.retry_after())
+                self._condition.wait(remaining)
+
+            heapq.heappop(self._waiting)
+            self._active += 1
+            self.stats["admitted"] += 1
+            admitted = time.monotonic()
+            self._wait_times.append(admitted - enqueued)
+            # The next waiter may be admissible too
+            self._condition.notify_all()
+            return admitted
+
+    def release(self, admitted):
+        with self._condition:
+            self._active -= 1
+            self._service_times.append(time.monotonic() - admitted)
+            self._condition.notify_all()
+
+    def get_stats(self):
+        """
+        :return: Queue depth, running jobs, counters and wait-time statistics in seconds.
+        """
+        with self._condition:
+            wait_times = sorted(self._wait_times)
+            stats = dict(
+                self.stats,
+                depth=len(self._waiting),
+                active=self._active,
+                concurrency=self.concurrency,
+                max_waiting=self.max_waiting,
+            )
+        if wait_times:
+            stats["wait_avg"] = sum(wait_times) / len(wait_times)
+            stats["wait_p95"] = wait_times[min(len(wait_times) - 1, int(len(wait_times) * 0.95))]
+            stats["wait_max"] = wait_times[-1]
+        return stats
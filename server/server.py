@@ -1,18 +1,215 @@
-from flask import Flask, request, jsonify
-from modules.course_scraper import get_departments, get_courses_by_department
-import requests
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from modules.course_scraper import get_catalog_version, get_course_details, get_course_retriever, get_departments, get_courses_by_department, get_department_for_prefix, get_search_index, start_catalog_sync, CatalogNotReadyError
+from modules.course_search import InvalidCursorError
+from modules.degree_rules import DISSERTATION_CODE, SEMINAR_CODES, THESIS_CODE
+from modules.metrics import PLAN_ABORTS, PLANS, PROMPT_CATALOG_TOKENS, PROMPT_TOKENS_SAVED, REQUEST_SECONDS, Gauge, render as render_metrics, timed
+from modules.ollama_client import OLLAMA_MODEL, OllamaError, chat_stream as ollama_chat_stream, warm_prefix
+from modules.plan_cache import PlanCache, plan_cache_key
+from modules.plan_solver import PlanInfeasibleError, solve_plan
+from modules.plan_schema import MAX_PLAN_TOKENS, PLAN_SCHEMA, OffSchemaError, PlanGuard
+from modules.plan_validator import has_plan_wide_violations, repair_prompt, semesters_to_repair, validate_plan
+from modules.prompts import STATIC_PREFIX, static_prefix_messages, student_details
+from modules.sessions import Conversation, SessionStore
+from modules.single_flight import SingleFlight
+from modules.work_queue import PRIORITY_BATCH, PRIORITY_INTERACTIVE, QueueFullError, WorkQueue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import gzip
+import hashlib
+import itertools
 import json
+import os
+import threading
+import time
 
 app = Flask(__name__)
 
 # Enable Flask's hot reloading
 app.config["DEBUG"] = True
 
-# Ollama API URL
-OLLAMA_URL = "http://localhost:11434/api/chat"
+# Per-session conversation state, bounded by a token budget and evicted when idle
+SESSION_TOKEN_BUDGET = 4096
+SESSION_TRUNCATION_POLICY = "truncate"
+MAX_SESSIONS = 1000
+SESSION_TTL_SECONDS = 30 * 60
+# Sessions live in SQLite so that every worker of a multi-worker server knows every session ID
+SESSION_DB_PATH = os.environ.get("PCP_SESSION_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"))
 
-# Initialize conversation history
-conversation_history = [{"role": "system", "content": "You are a helpful academic advisor."}]
+def new_conversation():
+    return Conversation(
+        static_prefix_messages(),
+        token_budget=SESSION_TOKEN_BUDGET,
+        policy=SESSION_TRUNCATION_POLICY,
+    )
+
+session_store = SessionStore(
+    new_conversation,
+    max_sessions=MAX_SESSIONS,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    path=SESSION_DB_PATH,
+)
+
+# Generated plans keyed by the normalized request; set PLAN_CACHE_DIR to None to keep them in memory only.
+# Only plans without rule violations are cached.
+PLAN_CACHE_MAX_ENTRIES = 1024
+PLAN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plan_cache")
+PLAN_CACHE_MAX_DISK_ENTRIES = 10000
+PLAN_CACHE_DISK_TTL_SECONDS = 30 * 24 * 60 * 60
+
+plan_cache = PlanCache(
+    max_entries=PLAN_CACHE_MAX_ENTRIES,
+    disk_dir=PLAN_CACHE_DIR,
+    max_disk_entries=PLAN_CACHE_MAX_DISK_ENTRIES,
+    disk_ttl_seconds=PLAN_CACHE_DISK_TTL_SECONDS,
+)
+
+# Build plans with the rule-based solver first; the model is only used when the solver
+# cannot satisfy the rules from the catalog or the client sends "Use LLM": true
+SOLVER_FAST_PATH = True
+
+# Constrain the model's output to the plan's JSON schema (Ollama structured outputs). The stream
+# is checked as it arrives either way, and generation stops once it goes off-schema or over budget.
+STRUCTURED_OUTPUT = True
+
+# The plan prompt lists only this many catalog courses of the student's department, picked by
+# TF-IDF relevance to their program of study and completed courses, so it stays the same size
+# however large the catalog is. Courses the rules require are always listed.
+RETRIEVAL_TOP_K = 40
+RETRIEVAL_PINNED_CODES = (DISSERTATION_CODE, THESIS_CODE) + SEMINAR_CODES
+
+# Model plans are checked against the degree rules; semesters that break one are
+# regenerated on their own, and plan-wide violations (e.g. missing credits) are fixed by
+# asking for semesters to add or replace, at most this many times
+MAX_REPAIR_ROUNDS = 1
+
+# Bounded, prioritized queue in front of the model. Catalog endpoints never go through it,
+# so they stay fast while generations are backed up; overload is answered with 503.
+# The limits are per process: with several workers, Ollama sees up to workers x MODEL_CONCURRENCY.
+MODEL_CONCURRENCY = int(os.environ.get("PCP_MODEL_CONCURRENCY", 2))
+MODEL_QUEUE_DEPTH = 32
+MODEL_QUEUE_TIMEOUT_SECONDS = 120
+
+model_queue = WorkQueue(
+    concurrency=MODEL_CONCURRENCY,
+    max_waiting=MODEL_QUEUE_DEPTH,
+    wait_timeout=MODEL_QUEUE_TIMEOUT_SECONDS,
+)
+
+Gauge("pcp_model_queue_depth", "Plan requests waiting for a model slot.", lambda: model_queue.get_stats()["depth"])
+Gauge("pcp_model_queue_active", "Plan requests holding a model slot.", lambda: model_queue.get_stats()["active"])
+Gauge("pcp_plan_cache_entries", "Plans held in the in-memory plan cache.", lambda: plan_cache.get_stats()["entries"])
+
+def request_priority():
+    """
+    Batch jobs send "X-Priority: batch" and yield to interactive users.
+    """
+    return PRIORITY_BATCH if request.headers.get("X-Priority") == "batch" else PRIORITY_INTERACTIVE
+
+def acquire_model_slot(priority):
+    """
+    Waits for a model slot, recording the wait.
+    :return: Admission time, to be passed to model_queue.release().
+    """
+    with timed("queue_wait"):
+        return model_queue.acquire(priority)
+
+def busy_response(e):
+    return jsonify({"error": str(e), "retry_after": e.retry_after}), 503, {"Retry-After": str(e.retry_after)}
+
+# Batch planning: jobs run at batch priority and wait out a full queue instead of failing.
+# A batch runs at most as many jobs at once as the model has slots, so it never fills the queue by itself.
+BATCH_MAX_CONCURRENCY = MODEL_CONCURRENCY
+BATCH_CONCURRENCY = BATCH_MAX_CONCURRENCY
+BATCH_MAX_RETRIES = 10
+
+# Identical plan requests in flight at the same time share one Ollama generation.
+# Followers give up after this long rather than waiting on a leader that never finishes.
+generation_flight = SingleFlight()
+GENERATION_WAIT_TIMEOUT_SECONDS = 600
+
+# Catalog responses carry an ETag derived from the catalog version so clients can revalidate
+# with If-None-Match; bodies above the threshold are gzipped once per version and kept here
+CATALOG_GZIP_MIN_BYTES = 1024
+CATALOG_RESPONSE_CACHE_ENTRIES = 256
+
+catalog_responses = OrderedDict()
+catalog_responses_lock = threading.Lock()
+
+def catalog_response(name, build):
+    """
+    Serves a catalog read conditionally.
+    :param name: Identifies the resource within a catalog version (e.g. the department).
+    :param build: Returns the JSON-serializable body; only called when the body is not cached.
+    :return: 304 if the client's ETag is current, otherwise the (possibly gzipped) JSON body.
+    """
+    digest = hashlib.sha1(f"{get_catalog_version()}:{name}".encode("utf-8")).hexdigest()[:24]
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if request.if_none_match.contains(digest):
+        return Response(status=304, headers=headers)
+
+    with catalog_responses_lock:
+        entry = catalog_responses.get(digest)
+        if entry is not None:
+            catalog_responses.move_to_end(digest)
+    if entry is None:
+        body = json.dumps(build()).encode("utf-8")
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= CATALOG_GZIP_MIN_BYTES else None
+        entry = (body, compressed)
+        with catalog_responses_lock:
+            catalog_responses[digest] = entry
+            while len(catalog_responses) > CATALOG_RESPONSE_CACHE_ENTRIES:
+                catalog_responses.popitem(last=False)
+
+    body, compressed = entry
+    if compressed is not None and "gzip" in request.accept_encodings:
+        body = compressed
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype="application/json", headers=headers)
+
+def plan_key(data):
+    # Plans also depend on the model, the static prompt and the catalog the prompt lists courses from
+    try:
+        catalog_version = get_catalog_version()
+    except CatalogNotReadyError:
+        catalog_version = None
+    return plan_cache_key(data, namespace=f"{OLLAMA_MODEL}\n{STATIC_PREFIX}\n{catalog_version}")
+
+def warm_prompt_cache():
+    """
+    Loads the model and prefills the static prompt prefix in the background.
+    """
+    try:
+        warm_prefix(static_prefix_messages())
+    except Exception as e:
+        print(f"Prompt cache warm-up failed: {e}")
+
+def warm_up():
+    """
+    Prepares a freshly started worker before it takes traffic: maps the catalog snapshot,
+    then loads the model and opens the pooled Ollama connection in the background.
+    The search index is built on the first search, so idle workers do not hold one.
+    """
+    try:
+        get_departments()
+    except CatalogNotReadyError:
+        # The first sync has not finished; the catalog is loaded on the first request instead
+        pass
+    threading.Thread(target=warm_prompt_cache, name="prompt-warmup", daemon=True).start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.get("request_started")
+    if started is not None:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or "unknown",
+            status=response.status_code,
+        )
+    return response
 
 @app.route("/get_departments", methods=["GET"])
 def get_departments_api():
@@ -20,164 +217,526 @@ def get_departments_api():
     Returns a list of available departments and their subject code prefixes.
     """
     try:
-        departments = get_departments()
-        return jsonify(departments)
+        return catalog_response("departments", get_departments)
+    except CatalogNotReadyError as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-@app.route("/get_courses", methods=["POST"])
+@app.route("/get_courses", methods=["GET", "POST"])
 def get_courses_api():
     """
     Fetches and returns courses dynamically based on the selected department.
-    Expects a JSON body with a "Department" key.
+    Expects a JSON body with a "Department" key, or GET with a "department" query parameter.
+    The department can also be given by its subject code prefix ("Prefix" or "prefix").
     """
     try:
-        data = request.get_json()
-        department = data.get("Department")
+        if request.method == "GET":
+            department = request.args.get("department")
+            prefix = request.args.get("prefix")
+        else:
+            data = request.get_json()
+            department = data.get("Department")
+            prefix = data.get("Prefix")
+        if not department and prefix:
+            department = get_department_for_prefix(prefix.strip().upper())
+            if department is None:
+                return jsonify({"error": f"Unknown subject prefix: {prefix}"}), 404
         if not department:
             return jsonify({"error": "Department is required"}), 400
 
-        courses = get_courses_by_department(department)
-        return jsonify(courses)
+        return catalog_response(("courses", department), lambda: get_courses_by_department(department))
+    except CatalogNotReadyError as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route("/get_course_details", methods=["GET"])
+def get_course_details_api():
+    """
+    Returns the full Kuali detail record of a course, e.g. for a "PID" returned by /search_courses.
+    Expects a "pid" query parameter.
+    """
+    try:
+        pid = request.args.get("pid")
+        if not pid:
+            return jsonify({"error": "pid is required"}), 400
+
+        details = get_course_details(pid)
+        if details is None:
+            return jsonify({"error": f"Unknown course: {pid}"}), 404
+        return catalog_response(("details", pid), lambda: details)
+    except CatalogNotReadyError as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# Page sizes of /search_courses
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+def optional_int(name):
+    value = request.args.get(name)
+    return int(value) if value not in (None, "") else None
+
+@app.route("/search_courses", methods=["GET"])
+def search_courses_api():
+    """
+    Searches the catalog by title words, course code, subject prefix or department name, tolerating
+    one typo per word. Query parameters: q, department, prefix, min_level, max_level, credits,
+    limit and cursor (the "next_cursor" of the previous page).
+    Returns {"results": [...], "total": n, "next_cursor": cursor or null}.
+    """
+    try:
+        try:
+            limit = max(1, min(optional_int("limit") or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT))
+            min_level = optional_int("min_level")
+            max_level = optional_int("max_level")
+            credits = optional_int("credits")
+        except ValueError:
+            return jsonify({"error": "limit, min_level, max_level and credits must be integers"}), 400
+
+        with timed("course_search"):
+            page = get_search_index().search(
+                request.args.get("q", ""),
+                department=request.args.get("department") or None,
+                prefix=request.args.get("prefix") or None,
+                min_level=min_level,
+                max_level=max_level,
+                credits=credits,
+                limit=limit,
+                cursor=request.args.get("cursor") or None,
+            )
+        return jsonify(page)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
+    except CatalogNotReadyError as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+def request_session_id(data):
+    return request.headers.get("X-Session-ID") or data.get("Session ID")
+
+def get_session(data):
+    """
+    :return: Tuple of (session_id, Conversation) for the current request.
+    """
+    return session_store.get(request_session_id(data))
+
+def relevant_courses(data):
+    """
+    Retrieves the catalog courses to list in the student's plan prompt.
+    :return: List of course dictionaries, or None if the catalog is not available yet.
+    """
+    try:
+        retriever = get_course_retriever(data.get("Department"))
+    except CatalogNotReadyError:
+        return None
+    with timed("course_retrieval"):
+        retrieved = retriever.top_k(
+            data.get("Program of Study") or "",
+            data.get("Completed Courses") or [],
+            k=RETRIEVAL_TOP_K,
+            pinned_codes=RETRIEVAL_PINNED_CODES,
+        )
+    PROMPT_CATALOG_TOKENS.observe(retrieved["prompt_tokens"])
+    PROMPT_TOKENS_SAVED.inc(retrieved["catalog_tokens"] - retrieved["prompt_tokens"])
+    return retrieved["courses"]
+
+def plan_messages(data, session_id=None):
+    """
+    Records the student's details as the current turn of their session and returns the messages
+    to send to the model.
+    :return: Tuple of (session_id, messages).
+    """
+    details = student_details(data, relevant_courses(data))
+
+    # The static rules are the pinned prefix; only the student details vary. Each plan request
+    # replaces the previous one, so a resubmitted form is not planned together with the old profile
+    # and the prompt depends only on what the plan cache key covers.
+    return session_store.add_turn(session_id, [{"role": "user", "content": details}], replace=True)
+
+class InvalidPlanError(ValueError):
+    """Raised when the model's answer does not contain a parseable plan."""
+
+def plan_stream(messages):
+    """
+    Starts a plan generation.
+    :return: Generator of Ollama chunks; closing it stops the generation.
+    """
+    return ollama_chat_stream(
+        messages,
+        options={"num_predict": MAX_PLAN_TOKENS},
+        format=PLAN_SCHEMA if STRUCTURED_OUTPUT else None,
+    )
+
+def off_schema_error(e):
+    PLAN_ABORTS.inc(reason=e.reason)
+    print(f"Aborted plan generation: {e}")
+    return InvalidPlanError(f"Invalid plan in Ollama response: {e}")
+
+def generate_plan(messages):
+    """
+    Streams a plan from Ollama, validating each semester as it completes.
+    The generation is abandoned as soon as the output goes off-schema or over budget.
+    """
+    guard = PlanGuard()
+    chunks = plan_stream(messages)
+    try:
+        with timed("model_call"):
+            for chunk in chunks:
+                guard.feed(chunk.get("message", {}).get("content", ""))
+                if guard.done:
+                    # Anything after the closing brace is not part of the plan
+                    break
+            return guard.finish()
+    except OffSchemaError as e:
+        raise off_schema_error(e)
+    finally:
+        chunks.close()
+
+def repair_plan(plan, data, messages):
+    """
+    Validates a model plan and re-prompts the model for only the semesters that break a rule,
+    or, for plan-wide violations, for the semesters to add or replace.
+    A repair is kept only if it reduces the number of violations.
+    :return: Tuple of (plan, remaining violations).
+    """
+    with timed("plan_validate"):
+        violations = validate_plan(plan, data)
+    for _ in range(MAX_REPAIR_ROUNDS):
+        semesters = None if has_plan_wide_violations(violations) else semesters_to_repair(plan, violations)
+        if semesters is not None and not semesters:
+            break
+        repair_messages = messages + [
+            {"role": "assistant", "content": json.dumps(plan)},
+            {"role": "user", "content": repair_prompt(plan, violations, semesters)},
+        ]
+        try:
+            fixed = generate_plan(repair_messages)
+        except InvalidPlanError:
+            break
+        candidate = dict(plan)
+        if semesters is None:
+            candidate.update(fixed)
+        else:
+            candidate.update({semester: fixed[semester] for semester in semesters if semester in fixed})
+        with timed("plan_validate"):
+            candidate_violations = validate_plan(candidate, data)
+        if len(candidate_violations) >= len(violations):
+            break
+        plan, violations = candidate, candidate_violations
+    return plan, violations
+
+def solve_with_rules(data):
+    """
+    Tries the rule-based solver for the request. Its plan is only served if it passes the
+    same validation as the model's plans.
+    :return: The plan, or None if the model should be used instead.
+    """
+    if not SOLVER_FAST_PATH or data.get("Use LLM", False):
+        return None
+    try:
+        with timed("solver"):
+            plan = solve_plan(data, get_courses_by_department(data.get("Department")))
+    except (CatalogNotReadyError, PlanInfeasibleError) as e:
+        print(f"Falling back to the model: {e}")
+        return None
+    with timed("plan_validate"):
+        violations = validate_plan(plan, data)
+    if violations:
+        print(f"Falling back to the model: the solver's plan breaks {len(violations)} rule(s): {violations[0]['message']}")
+        return None
+    return plan
+
+def plan_lines(plan):
+    return [json.dumps({"Semester": semester, "Details": details}) + "\n" for semester, details in plan.items()] + [
+        json.dumps({"done": True}) + "\n"
+    ]
+
+def build_plan(data, session_id=None, priority=PRIORITY_INTERACTIVE):
+    """
+    Produces the plan for one payload: the rule-based solver first, then the plan cache,
+    then an identical generation already in flight, and finally the model through the
+    work queue.
+    :return: Tuple of (plan, headers describing how the plan was produced).
+    """
+    solved_plan = solve_with_rules(data)
+    if solved_plan is not None:
+        session_id, _ = session_store.get(session_id)
+        PLANS.inc(source="solver")
+        return solved_plan, {"X-Session-ID": session_id, "X-Planner": "solver"}
+
+    key = plan_key(data)
+    cached_plan = plan_cache.get(key)
+    if cached_plan is not None:
+        session_id, _ = session_store.get(session_id)
+        PLANS.inc(source="cache")
+        return cached_plan, {"X-Session-ID": session_id, "X-Plan-Cache": "hit"}
+
+    call, is_leader = generation_flight.begin(key)
+    if not is_leader:
+        session_id, _ = session_store.get(session_id)
+        plan = call.wait(GENERATION_WAIT_TIMEOUT_SECONDS)
+        PLANS.inc(source="shared")
+        return plan, {"X-Session-ID": session_id, "X-Plan-Cache": "shared"}
+
+    plan = None
+    error = InvalidPlanError("Plan generation was interrupted")
+    try:
+        admitted = acquire_model_slot(priority)
+        try:
+            session_id, messages = plan_messages(data, session_id)
+            plan, violations = repair_plan(generate_plan(messages), data, messages)
+        finally:
+            model_queue.release(admitted)
+        PLANS.inc(source="model")
+        if not violations:
+            plan_cache.put(key, plan)
+        error = None
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Always release the key, otherwise identical requests would wait on it forever
+        generation_flight.finish(key, call, result=plan, error=error)
+    return plan, {
+        "X-Session-ID": session_id,
+        "X-Plan-Cache": "miss",
+        "X-Plan-Violations": str(len(violations)),
+    }
+
 @app.route("/generate_subjects", methods=["POST"])
 def generate_subjects():
     """
     Generates subject suggestions using the Ollama model based on client input.
+    Identical requests arriving while a plan is being generated wait for that plan.
     """
-    global conversation_history
-
     try:
         # Parse input JSON
         data = request.get_json()
-        department = data.get("Department")
-        program_of_study = data.get("Program of Study")
-        masters_completed = data.get("Masters Completed", False)
-        completed_courses = data.get("Completed Courses")
-        completed_credits = sum(int(course["Credits"]) for course in completed_courses)
-        ms_needed = not masters_completed and completed_credits < 30
-        ms_credits_required = 30 - completed_credits if ms_needed else 0
-
-        # Step 1: Send Initial Rules and Context
-        initial_rules = """
-        Rules:
-        - Minimum of 72 credits in engineering, mathematics, and/or science courses.
-        - The M. S. degree may count for up to 30 of the 72 credits required for the Ph. D.
-        - Minimum of 18 credits, beyond the first 30 credits, in formal graduate engineering, 
-        mathematics, and/or science courses. 
-        - Up to three credits of special problems (ELE 591 and/or ELE 691), sometimes called 
-        “independent study,” may be counted toward this requirement. 
-        - Maximum of nine credits of special problems (ELE 591 and/or ELE 691) and special topics 
-        (ELE 594 and/or ELE 694) may be counted toward this requirement. Department seminar (ELE 601 and ELE 602) may not be counted
-        toward this requirement.
-        - At least 18, but no more than 24, credits of dissertation (ELE 699). Additional ELE 699 credits may be completed for no program credit.
-        - All full-time graduate students (M. S. or Ph. D.) are required to enroll in ELE 601 every semester the course offered. (It is offered only on Fall Semesters)
-        - Minimum of two credits of departmental seminar (ELE 601 and ELE 602). These credits may not be counted toward the 42 credits required beyond the first 30 credits (or the M. S. degree).
-
-        If a student has not completed M.S. there are more rules for the initial 30 credits: 
-        - Complete a minimum of 30 credits, which include engineering mathematics and/or science courses. 
-        - At least 16 credits must be from formal graduate electrical engineering (ELE) courses, excluding ELE 601 and ELE 602 (departmental seminars).
-        - The Course Restrictions are: 
-            - A maximum of 12 credits can be taken from senior undergraduate (400-level) courses in engineering, mathematics and/or science.
-            - Up to three credits can be from special problems or independent study courses (ELE 591/592/691/692).
-            - All full-time graduate students are required to enroll in the departmental seminar ELE 601 every semester it is offered.
-        - Can pick 6-9 credits of thesis research (ELE 599), where six credits are standard. More than six credits require approval from your thesis committee and the Graduate Director/Department Chair.
-        
-        For students that have not yet completed their M.S. degree, the courses they pick should comprise of both the M.S. and Ph.D. requirements. 
-        For students that have completed M.S. degree, only 42 credits need to be planned. 
-        Only 8 credits of Doctoral Dissertation can be taken per semester. 
-        Only courses of 500 level or higher can be taken.
-        Each seminar is 1 credit. 
-        Students must have Doctoral Dissertation credits in their plan every semester even during their masters requirements.  
-        """
-        conversation_history.append({"role": "assistant", "content": initial_rules})
-        # Step 2: Provide User-Specific Details
-        user_details = f""" This is the detail of the student: 
-        - Program of Study: {program_of_study}
-        - Department: {department}
-        - Total Credits Completed: {completed_credits}
-        - Master's Degree Completed: {"Yes" if masters_completed else "No"}
-        - Credits Remaining for MS: {ms_credits_required if ms_needed else 0}
-        - Completed Courses: {json.dumps(completed_courses, indent=2)}
-        """
-        conversation_history.append({"role": "user", "content": user_details})
-
-        # Step 3: Request Academic Plan
-        prompt_request = """
-        Based on the provided details, generate a structured academic plan in JSON format:
-        {{
-            "Semester 1": {{
-                "Total Credits": integer,
-                "Courses": [
-                    {{
-                        "Course Name": string,
-                        "Course Code": string,
-                        "Credits": integer
-                    }}
-                ]
-            }},
-            "Semester 2": {{
-                "Total Credits": integer,
-                "Courses": [
-                    {{
-                        "Course Name": string,
-                        "Course Code": string,
-                        "Credits": integer
-                    }}
-                ]
-            }},
-        }}
-        - Don't add any comments. Just provide the full 72 credit plan for all semesters. 
-        """
-        conversation_history.append({"role": "user", "content": prompt_request})
-        # print(conversation_history)
-        # Send the request to Ollama API with streaming enabled
-        response = requests.post(
-            OLLAMA_URL,
-            json={"model": "llama3.3", "messages": conversation_history},
-            stream=True,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        # Collect and consolidate the streamed response
-        full_response = ""
-        if response.status_code == 200:
-            for chunk in response.iter_lines():
-                if chunk:
-                    data = json.loads(chunk.decode("utf-8"))
-                    message_content = data.get("message", {}).get("content", "")
-                    full_response += message_content
-                    if data.get("done", False):
-                        break
-        else:
-            return jsonify({"error": "Failed to connect to Ollama API"}), response.status_code
+        plan, headers = build_plan(data, request_session_id(data), request_priority())
+        return jsonify(plan), 200, headers
 
-        # Add assistant response to conversation history
-        # conversation_history.append({"role": "assistant", "content": full_response})
-        # Extract and validate the JSON part
-        try:
-            json_start = full_response.find("{")
-            json_end = full_response.rfind("}")
-            json_part = full_response[json_start:json_end + 1]
-            json_response = json.loads(json_part)
-        except json.JSONDecodeError as e:
-            print("Error decoding JSON:", e)
-            print("Raw Output:", full_response)
-            return jsonify({"error": "Invalid JSON format in Ollama response"}), 500
+    except QueueFullError as e:
+        return busy_response(e)
+    except OllamaError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except InvalidPlanError as e:
+        return jsonify({"error": str(e)}), 500
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(json_response)
+@app.route("/generate_subjects_stream", methods=["POST"])
+def generate_subjects_stream():
+    """
+    Streaming variant of /generate_subjects. Responds with NDJSON: one
+    {"Semester": name, "Details": {...}} line per semester as soon as the model closes it,
+    a line with "Repaired": true for every semester the repair pass replaced or added, then
+    {"done": true, "Violations": [...]}. Errors after the stream has started arrive as {"error": message}.
+    Identical requests arriving meanwhile receive the finished plan in the same format.
+    """
+    try:
+        data = request.get_json()
+        solved_plan = solve_with_rules(data)
+        if solved_plan is not None:
+            session_id, _ = get_session(data)
+            PLANS.inc(source="solver")
+            return Response(plan_lines(solved_plan), mimetype="application/x-ndjson",
+                            headers={"X-Session-ID": session_id, "X-Planner": "solver"})
+
+        key = plan_key(data)
+        cached_plan = plan_cache.get(key)
+        if cached_plan is not None:
+            session_id, _ = get_session(data)
+            PLANS.inc(source="cache")
+            return Response(plan_lines(cached_plan), mimetype="application/x-ndjson",
+                            headers={"X-Session-ID": session_id, "X-Plan-Cache": "hit"})
 
+        call, is_leader = generation_flight.begin(key)
+        if not is_leader:
+            session_id, _ = get_session(data)
+            plan = call.wait(GENERATION_WAIT_TIMEOUT_SECONDS)
+            PLANS.inc(source="shared")
+            return Response(plan_lines(plan), mimetype="application/x-ndjson",
+                            headers={"X-Session-ID": session_id, "X-Plan-Cache": "shared"})
+
+        admitted = None
+        try:
+            # The slot is held until the stream finishes (released in generate())
+            admitted = acquire_model_slot(request_priority())
+            session_id, messages = plan_messages(data, request_session_id(data))
+            chunks = plan_stream(messages)
+            # Start the upstream request now so connection errors still get a proper status code
+            first = next(chunks, None)
+        except Exception as e:
+            if admitted is not None:
+                model_queue.release(admitted)
+            generation_flight.finish(key, call, error=e)
+            raise
+    except QueueFullError as e:
+        return busy_response(e)
+    except OllamaError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except InvalidPlanError as e:
+        return jsonify({"error": str(e)}), 500
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+    closed = threading.Lock()
+
+    def close_stream(result, error):
+        # Runs once: from generate() when the stream ends, or from Flask if the client went away first
+        if closed.acquire(blocking=False):
+            # Stops the generation if it is still running
+            chunks.close()
+            model_queue.release(admitted)
+            generation_flight.finish(key, call, result=result, error=error)
+
+    def generate():
+        guard = PlanGuard()
+        plan = None
+        error = InvalidPlanError("Plan stream was interrupted")
+        try:
+            pending = [first] if first is not None else []
+            for chunk in itertools.chain(pending, chunks):
+                content = chunk.get("message", {}).get("content", "")
+                for semester, details in guard.feed(content):
+                    yield json.dumps({"Semester": semester, "Details": details}) + "\n"
+                if guard.done:
+                    break
+            streamed_plan = guard.finish()
+            # Semesters regenerated by the repair pass replace the ones already sent
+            plan, violations = repair_plan(streamed_plan, data, messages)
+            for semester, details in plan.items():
+                if details is not streamed_plan.get(semester):
+                    yield json.dumps({"Semester": semester, "Details": details, "Repaired": True}) + "\n"
+            PLANS.inc(source="model")
+            if not violations:
+                plan_cache.put(key, plan)
+            error = None
+            yield json.dumps({"done": True, "Violations": violations}) + "\n"
+        except OffSchemaError as e:
+            error = off_schema_error(e)
+            yield json.dumps({"error": str(error)}) + "\n"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            error = e
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            close_stream(plan, error)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"X-Session-ID": session_id, "X-Plan-Cache": "miss"},
+    )
+    response.call_on_close(lambda: close_stream(None, InvalidPlanError("Plan stream was interrupted")))
+    return response
+
+def build_batch_plan(data):
+    """
+    build_plan() at batch priority, retrying while the work queue is full.
+    """
+    for attempt in range(BATCH_MAX_RETRIES + 1):
+        try:
+            return build_plan(data, data.get("Session ID"), PRIORITY_BATCH)
+        except QueueFullError as e:
+            if attempt == BATCH_MAX_RETRIES:
+                raise
+            time.sleep(min(e.retry_after, 30))
+
+def parse_batch_body():
+    """
+    Reads a batch body: a JSON list of payloads, or NDJSON with one payload per line.
+    """
+    body = request.get_data(as_text=True).strip()
+    if body.startswith("["):
+        return json.loads(body)
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+@app.route("/generate_subjects_batch", methods=["POST"])
+def generate_subjects_batch():
+    """
+    Generates plans for many students in one call. Accepts a JSON list or NDJSON of payloads
+    in the same shape as /generate_subjects (an optional "id" is echoed back) and streams
+    NDJSON results in completion order: {"index", "id", "plan", "elapsed"} or {"index", "id", "error"}.
+    The number of parallel jobs can be set with ?concurrency=N, up to BATCH_MAX_CONCURRENCY.
+    """
+    try:
+        payloads = parse_batch_body()
+        concurrency = max(1, min(int(request.args.get("concurrency", BATCH_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch body: {e}"}), 400
+
+    def run(data):
+        started = time.monotonic()
+        plan, _ = build_batch_plan(data)
+        return plan, time.monotonic() - started
+
+    def generate():
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+        futures = {executor.submit(run, data): index for index, data in enumerate(payloads)}
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                result = {"index": index, "id": payloads[index].get("id")}
+                try:
+                    plan, elapsed = future.result()
+                    result.update(plan=plan, elapsed=round(elapsed, 3))
+                except Exception as e:
+                    result["error"] = str(e)
+                yield json.dumps(result) + "\n"
+        finally:
+            # Drop queued jobs if the client went away
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route("/queue_stats", methods=["GET"])
+def queue_stats_api():
+    """
+    Returns depth, wait-time and rejection statistics of the model work queue.
+    """
+    return jsonify(model_queue.get_stats())
+
+@app.route("/plan_cache_stats", methods=["GET"])
+def plan_cache_stats_api():
+    """
+    Returns hit/miss statistics of the plan cache.
+    """
+    return jsonify(plan_cache.get_stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics_api():
+    """
+    Returns stage timings, upstream call counts, cache lookups and model token statistics
+    in the Prometheus text format.
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    # Enable hot reloading
-    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=True)
+    # The reloader's watcher process also runs this block; only sync in the serving process
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_catalog_sync()
+        warm_up()
+    # Enable hot reloading; requests are served on separate threads so catalog calls never wait on the model
+    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=True, threaded=True)
@@ -0,0 +1,11 @@
+"""
+Production entry point. Serve with several workers from the server directory:
+
+    gunicorn -c gunicorn.conf.py
+
+Every worker imports this module; gunicorn.conf.py warms each one up and lets a single
+worker keep the shared catalog store and snapshot in sync.
+"""
+from server import app
+
+app.config["DEBUG"] = False